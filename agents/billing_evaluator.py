@@ -9,18 +9,20 @@ import re
 from typing import Dict, List
 from bs4 import BeautifulSoup
 
-import ollama
-
-from utils.config import OLLAMA_MODEL
+from utils.config import LLM_EXTRACT_OPTIONS
 from utils.prompts import PromptLibrary
-from utils.utils import BillInfo
+from utils.llm_client import llm_client
+from utils.utils import BillInfo, HTML_PARSER, JSON_OBJECT_RE, NON_AMOUNT_CHARS_RE
+
+# Lines that might contain billing data (one case-insensitive search instead of lowering every line per keyword)
+BILLING_LINE_RE = re.compile(r'\$|bill|amount|date|payment|due|balance|transaction', re.IGNORECASE)
 
 
 class BillingDataEvaluator:
     """AI agent that evaluates if a page contains sufficient billing data"""
     
     def __init__(self):
-        self.model = OLLAMA_MODEL
+        self.model = llm_client.fast_model
     
     def evaluate_page_sufficiency(self, page_source: str) -> Dict:
         """
@@ -39,15 +41,12 @@ class BillingDataEvaluator:
             page_content = self._prepare_page_content(page_source)
             
             # Get AI billing data evaluation
-            prompt = PromptLibrary.get_prompt('billing_data_evaluation', page_content=page_content)
+            messages = PromptLibrary.get_messages('billing_data_evaluation', page_content=page_content)
             
-            response = ollama.chat(
+            response = llm_client.chat_json(
                 model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                options={
-                    "temperature": 0.1,
-                    "num_predict": 800
-                }
+                messages=messages,
+                options={**LLM_EXTRACT_OPTIONS, "num_predict": 800}
             )
             
             response_content = response["message"]["content"]
@@ -127,7 +126,7 @@ class BillingDataEvaluator:
     
     def _prepare_page_content(self, page_source: str) -> str:
         """Prepare clean page content for AI analysis"""
-        soup = BeautifulSoup(page_source, 'html.parser')
+        soup = BeautifulSoup(page_source, HTML_PARSER)
         
         # Remove script, style, and other non-content elements
         for element in soup(['script', 'style', 'nav', 'header', 'footer']):
@@ -145,13 +144,14 @@ class BillingDataEvaluator:
             if len(line) < 3:
                 continue
             # Keep lines that might contain billing data
-            if any(keyword in line.lower() for keyword in ['$', 'bill', 'amount', 'date', 'payment', 'due', 'balance', 'transaction']):
+            if BILLING_LINE_RE.search(line):
                 relevant_lines.append(line)
             elif len(relevant_lines) < 50:  # Keep some context
                 relevant_lines.append(line)
+            if len(relevant_lines) >= 100:  # Limit to reasonable size for AI
+                break
         
-        # Limit to reasonable size for AI
-        return '\n'.join(relevant_lines[:100])
+        return '\n'.join(relevant_lines)
     
     def _parse_ai_response(self, response_content: str) -> Dict:
         """Parse AI response with error handling"""
@@ -159,7 +159,7 @@ class BillingDataEvaluator:
             return json.loads(response_content)
         except json.JSONDecodeError:
             # Try to extract JSON from response
-            json_match = re.search(r'\{.*\}', response_content, re.DOTALL)
+            json_match = JSON_OBJECT_RE.search(response_content)
             if json_match:
                 return json.loads(json_match.group())
             else:
@@ -170,7 +170,7 @@ class BillingDataEvaluator:
         """Parse amount string to float"""
         try:
             # Extract numeric value from amount string
-            amount_clean = re.sub(r'[^0-9.]', '', str(amount_str))
+            amount_clean = NON_AMOUNT_CHARS_RE.sub('', str(amount_str))
             return float(amount_clean) if amount_clean else 0.0
         except:
             return 0.0
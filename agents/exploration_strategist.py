@@ -6,20 +6,58 @@ AI agent responsible for determining next exploration steps when insufficient bi
 
 import json
 import re
-from typing import Dict, List
+from itertools import chain, islice
+from typing import Dict, Iterator, List
 from bs4 import BeautifulSoup
 
-import ollama
-
-from utils.config import OLLAMA_MODEL
+from utils.config import LLM_EXTRACT_OPTIONS, HIGH_PRIORITY_NAV, MEDIUM_PRIORITY_NAV
 from utils.prompts import PromptLibrary
+from utils.llm_client import llm_client
+from utils.utils import get_base_url, canonical_url, parse_html, JSON_OBJECT_RE
+
+# Quoted URL inside an onclick handler, e.g. location.href='/billing'
+ONCLICK_URL_RE = re.compile(r'["\']([^"\']+)["\']')
+
+# Links and onclick elements inside sidebar/SPA navigation containers (one grouped select)
+SIDEBAR_CONTAINERS = ', '.join([
+    'nav', 'aside', '.sidebar', '#sidebar', '.nav-sidebar',
+    '.side-nav', '.navigation', '.menu', '.nav-menu',
+    '.left-nav', '.right-nav', '[role="navigation"]',
+    '.utility-nav', '.account-nav', '.billing-nav',
+    # Angular Material and SPA specific selectors
+    'mat-nav-list', 'mat-list-item', '.mat-list-item',
+    '[routerlink]', '[ng-click]', '[ui-sref]',
+    # Common SPA sidebar patterns
+    '.nav-item', '.nav-link', '.menu-item', '.sidebar-menu'
+])
+SIDEBAR_CLICKABLE_SELECTOR = (
+    f':is({SIDEBAR_CONTAINERS}) :is(a[href], div[onclick], span[onclick], li[onclick], button[onclick])'
+)
+
+# Expandable/dropdown menu triggers
+DROPDOWN_SELECTOR = ', '.join([
+    '[data-toggle="collapse"]', '[data-bs-toggle="collapse"]',
+    '.dropdown-toggle', '.collapse-toggle', '.menu-toggle',
+    # Angular Material expansion panels
+    'mat-expansion-panel-header', '.mat-expansion-panel-header',
+    # Bootstrap and common dropdown patterns
+    '.nav-item.dropdown', '.dropdown', '[aria-expanded]'
+])
+
+SPA_CLICK_ATTRS = ('ng-click', 'routerlink', 'ui-sref', 'data-target', 'data-toggle')
+BILLING_TEXT_TAGS = frozenset(['a', 'button', 'div', 'span', 'li'])
+BILLING_NAV_RE = re.compile('|'.join(re.escape(keyword) for keyword in HIGH_PRIORITY_NAV + MEDIUM_PRIORITY_NAV + [
+    'transactions', 'transaction history', 'account detail', 'account history',
+    'billing history', 'payment history', 'bill history', 'my account',
+    'bill & pay', 'bill pay', 'billing & payments', 'bills & payments'
+]), re.IGNORECASE)
 
 
 class ExplorationStrategist:
     """AI agent that determines exploration strategy for finding billing data"""
     
     def __init__(self):
-        self.model = OLLAMA_MODEL
+        self.model = llm_client.fast_model
     
     def determine_exploration_strategy(self, current_url: str, page_source: str, visited_urls: set) -> Dict:
         """
@@ -28,7 +66,7 @@ class ExplorationStrategist:
         Args:
             current_url: Current page URL
             page_source: Raw HTML content of the page
-            visited_urls: Set of already visited URLs
+            visited_urls: Set of already visited URLs (canonical_url forms)
             
         Returns:
             Dict with exploration strategy including next links and priorities
@@ -37,7 +75,7 @@ class ExplorationStrategist:
             print(f"🧠 Consulting AI for exploration strategy...")
             
             # Get page title
-            soup = BeautifulSoup(page_source, 'html.parser')
+            soup = parse_html(page_source)
             page_title = soup.title.get_text(strip=True) if soup.title else "No title"
             
             # Discover available links on current page
@@ -51,15 +89,12 @@ class ExplorationStrategist:
             }
             
             # Get AI exploration strategy
-            prompt = PromptLibrary.get_prompt('exploration_strategy', **prompt_data)
+            messages = PromptLibrary.get_messages('exploration_strategy', **prompt_data)
             
-            response = ollama.chat(
+            response = llm_client.chat_json(
                 model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                options={
-                    "temperature": 0.1,
-                    "num_predict": 1000
-                }
+                messages=messages,
+                options={**LLM_EXTRACT_OPTIONS, "num_predict": 1000}
             )
             
             response_content = response["message"]["content"]
@@ -80,10 +115,10 @@ class ExplorationStrategist:
     def _discover_available_links(self, soup: BeautifulSoup, current_url: str, visited_urls: set) -> List[Dict]:
         """Discover available links on current page with sidebar prioritization"""
         elements = self._find_clickable_elements(soup)
-        base_domain = '/'.join(current_url.split('/')[:3])
+        base_domain = get_base_url(current_url)
         
         discovered_links = []
-        for element in elements[:20]:  # Increased limit for better coverage
+        for element in islice(elements, 20):  # Increased limit for better coverage
             try:
                 text = element.get_text(strip=True)
                 if len(text) < 2:
@@ -92,7 +127,7 @@ class ExplorationStrategist:
                 href = element.get('href', '')
                 full_url = self._construct_full_url(element, base_domain)
                 
-                if full_url and full_url not in visited_urls:
+                if full_url and canonical_url(full_url) not in visited_urls:
                     # Determine element location and priority
                     location, priority_boost = self._analyze_element_location(element)
                     
@@ -110,44 +145,39 @@ class ExplorationStrategist:
     
     def _analyze_element_location(self, element) -> tuple:
         """Analyze where the element is located and assign priority boost"""
-        # Check if element is in sidebar
-        parent = element.parent
         location = "main"
         priority_boost = 0
         
+        sidebar_indicators = [
+            'sidebar', 'nav', 'navigation', 'menu', 'side-nav', 
+            'left-nav', 'right-nav', 'utility-nav', 'account-nav'
+        ]
+        
         # Traverse up the DOM to check for sidebar containers
         current = element
         for _ in range(5):  # Check up to 5 levels up
             if current is None:
                 break
                 
-            # Check element classes and IDs for sidebar indicators
+            # Check element classes and IDs for sidebar indicators (casefold once per level)
             classes = current.get('class', [])
-            element_id = current.get('id', '')
-            
             if isinstance(classes, list):
                 classes = ' '.join(classes)
+            classes_lc = classes.casefold()
+            element_id_lc = current.get('id', '').casefold()
             
-            sidebar_indicators = [
-                'sidebar', 'nav', 'navigation', 'menu', 'side-nav', 
-                'left-nav', 'right-nav', 'utility-nav', 'account-nav'
-            ]
-            
-            if any(indicator in classes.lower() for indicator in sidebar_indicators):
+            if (any(indicator in classes_lc for indicator in sidebar_indicators) or
+                    any(indicator in element_id_lc for indicator in sidebar_indicators)):
                 location = "sidebar"
                 priority_boost = 5  # High boost for sidebar elements
                 break
-            elif any(indicator in element_id.lower() for indicator in sidebar_indicators):
-                location = "sidebar"
-                priority_boost = 5
-                break
             
             # Check for header/footer
-            if any(indicator in classes.lower() for indicator in ['header', 'top-nav']):
+            if 'header' in classes_lc or 'top-nav' in classes_lc:
                 location = "header"
                 priority_boost = 2
                 break
-            elif any(indicator in classes.lower() for indicator in ['footer', 'bottom']):
+            elif 'footer' in classes_lc or 'bottom' in classes_lc:
                 location = "footer"
                 priority_boost = 1
                 break
@@ -155,106 +185,47 @@ class ExplorationStrategist:
             current = current.parent
         
         # Additional boost for high-priority billing keywords
-        text = element.get_text(strip=True).lower()
+        text_lc = element.get_text(strip=True).casefold()
         high_priority_keywords = [
             'transactions', 'transaction history', 'account detail', 
             'billing history', 'payment history', 'account history'
         ]
         
-        if any(keyword in text for keyword in high_priority_keywords):
+        if any(keyword in text_lc for keyword in high_priority_keywords):
             priority_boost += 3
             
         return location, priority_boost
     
-    def _find_clickable_elements(self, soup: BeautifulSoup) -> List:
-        """Find all potentially clickable elements with special focus on sidebar navigation and SPA elements"""
-        elements = []
-        
+    def _find_clickable_elements(self, soup: BeautifulSoup) -> Iterator:
+        """Yield potentially clickable elements in priority order, with special focus on sidebar navigation and SPA elements"""
         # PRIORITY 1: Sidebar navigation elements (highest priority)
-        sidebar_selectors = [
-            'nav', 'aside', '.sidebar', '#sidebar', '.nav-sidebar', 
-            '.side-nav', '.navigation', '.menu', '.nav-menu',
-            '.left-nav', '.right-nav', '[role="navigation"]',
-            '.utility-nav', '.account-nav', '.billing-nav',
-            # Angular Material and SPA specific selectors
-            'mat-nav-list', 'mat-list-item', '.mat-list-item',
-            '[routerlink]', '[ng-click]', '[ui-sref]',
-            # Common SPA sidebar patterns
-            '.nav-item', '.nav-link', '.menu-item', '.sidebar-menu'
-        ]
-        
-        for selector in sidebar_selectors:
-            sidebar_elements = soup.select(selector)
-            for sidebar in sidebar_elements:
-                # Find links within sidebar
-                sidebar_links = sidebar.find_all('a', href=True)
-                elements.extend(sidebar_links)
-                # Also check for clickable divs/spans in sidebar
-                sidebar_clickable = sidebar.find_all(['div', 'span', 'li', 'button'], onclick=True)
-                elements.extend(sidebar_clickable)
-                # SPA specific clickable elements
-                spa_clickable = sidebar.find_all(['div', 'span', 'li', 'button'], attrs={
-                    'routerlink': True, 'ng-click': True, 'ui-sref': True, 'data-target': True
-                })
-                elements.extend(spa_clickable)
-        
         # PRIORITY 2: Look for expandable/dropdown menu triggers
-        dropdown_selectors = [
-            '[data-toggle="collapse"]', '[data-bs-toggle="collapse"]',
-            '.dropdown-toggle', '.collapse-toggle', '.menu-toggle',
-            # Angular Material expansion panels
-            'mat-expansion-panel-header', '.mat-expansion-panel-header',
-            # Bootstrap and common dropdown patterns
-            '.nav-item.dropdown', '.dropdown', '[aria-expanded]'
-        ]
-        
-        for selector in dropdown_selectors:
-            dropdown_elements = soup.select(selector)
-            elements.extend(dropdown_elements)
-        
-        # PRIORITY 3: Standard links with billing keywords
-        standard_links = soup.find_all('a', href=True)
-        elements.extend(standard_links)
-        
-        # PRIORITY 4: Buttons and interactive elements
-        buttons = soup.find_all(['button', 'div', 'span'], onclick=True)
-        elements.extend(buttons)
-        
-        # PRIORITY 5: SPA-specific elements
-        spa_elements = []
-        spa_elements.extend(soup.find_all(attrs={'ng-click': True}))
-        spa_elements.extend(soup.find_all(attrs={'routerlink': True}))
-        spa_elements.extend(soup.find_all(attrs={'ui-sref': True}))
-        spa_elements.extend(soup.find_all(attrs={'data-target': True}))
-        spa_elements.extend(soup.find_all(attrs={'data-toggle': True}))
-        elements.extend(spa_elements)
-        
-        # PRIORITY 6: Elements with high-priority billing text
-        from .config import HIGH_PRIORITY_NAV, MEDIUM_PRIORITY_NAV
-        
-        billing_keywords = HIGH_PRIORITY_NAV + MEDIUM_PRIORITY_NAV + [
-            'transactions', 'transaction history', 'account detail', 'account history',
-            'billing history', 'payment history', 'bill history', 'my account',
-            'bill & pay', 'bill pay', 'billing & payments', 'bills & payments'
-        ]
-        
-        all_elements = soup.find_all(['a', 'button', 'div', 'span', 'li'])
-        for element in all_elements:
-            text = element.get_text(strip=True).lower()
-            if any(keyword in text for keyword in billing_keywords):
-                if element not in elements:
-                    elements.append(element)
+        # PRIORITY 3-6: only walked if the caller still wants more elements
+        elements = chain(soup.select(SIDEBAR_CLICKABLE_SELECTOR), soup.select(DROPDOWN_SELECTOR),
+                         self._bucket_page_clickables(soup))
         
         # Remove duplicates while preserving order (prioritizing sidebar elements)
         seen = set()
-        unique_elements = []
         for element in elements:
             element_id = id(element)
             if element_id not in seen:
                 seen.add(element_id)
-                unique_elements.append(element)
-        
-        return unique_elements
+                yield element
+    
+    def _bucket_page_clickables(self, soup: BeautifulSoup) -> Iterator:
+        """Standard links, onclick buttons, SPA-specific elements, then elements with high-priority billing text (one tree walk)"""
+        links, buttons, spa_elements, keyword_elements = [], [], [], []
+        for element in soup.find_all(True):
+            name = element.name
+            if name == 'a' and element.has_attr('href'):
+                links.append(element)
+            if name in ('button', 'div', 'span') and element.has_attr('onclick'):
+                buttons.append(element)
+            if any(element.has_attr(attr) for attr in SPA_CLICK_ATTRS):
+                spa_elements.append(element)
+            if name in BILLING_TEXT_TAGS and BILLING_NAV_RE.search(element.get_text(strip=True)):
+                keyword_elements.append(element)
+        yield from chain(links, buttons, spa_elements, keyword_elements)
     
     def _construct_full_url(self, element, base_domain: str) -> str:
         """Construct full URL from element"""
@@ -278,7 +249,7 @@ class ExplorationStrategist:
                 return base_domain + router_link if not router_link.startswith('/') else base_domain + router_link
             elif onclick and 'location' in onclick:
                 # Extract URL from onclick
-                url_match = re.search(r'["\']([^"\']+)["\']', onclick)
+                url_match = ONCLICK_URL_RE.search(onclick)
                 if url_match:
                     url = url_match.group(1)
                     if url.startswith('/'):
@@ -297,7 +268,7 @@ class ExplorationStrategist:
             return json.loads(response_content)
         except json.JSONDecodeError:
             # Try to extract JSON from response
-            json_match = re.search(r'\{.*\}', response_content, re.DOTALL)
+            json_match = JSON_OBJECT_RE.search(response_content)
             if json_match:
                 return json.loads(json_match.group())
             else:
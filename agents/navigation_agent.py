@@ -7,20 +7,139 @@ AI-powered intelligent navigation and exploration of billing sites
 import time
 import json
 import re
+import hashlib
+import heapq
+from collections import OrderedDict
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Set, Optional
 
-import ollama
-from bs4 import BeautifulSoup
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, StaleElementReferenceException
 
 from utils.config import (
-    OLLAMA_MODEL, MAX_EXPLORATION_TIME, EXPLORATION_THRESHOLD, 
+    MAX_EXPLORATION_TIME, EXPLORATION_THRESHOLD, SUFFICIENT_BILL_COUNT, PAGE_CACHE_SIZE, SPA_RERENDER_WAIT,
     HIGH_PRIORITY_NAV, MEDIUM_PRIORITY_NAV, LOW_PRIORITY_NAV,
-    COMMON_BILLING_PATTERNS
+    COMMON_BILLING_PATTERNS, LLM_EXTRACT_OPTIONS
+)
+from utils.utils import (
+    wait_for_spa_content, has_meaningful_billing_data, get_base_url, canonical_url, parse_html, get_page_text,
+    get_relevant_html, MAIN_CONTENT_HTML_JS, JSON_OBJECT_RE, WHITESPACE_RE
 )
-from utils.utils import wait_for_spa_content, has_meaningful_billing_data
 from utils.prompts import PromptLibrary
+from utils.llm_client import llm_client
+
+# Billing page quality scoring patterns (compiled once, used for every table row)
+# One search per pattern - overlapping patterns each contribute their matches to the score
+SCORE_DATE_RES = [re.compile(pattern) for pattern in [
+    r'(\d{1,2}/\d{1,2}/\d{4})',  # MM/DD/YYYY
+    r'(\d{4}-\d{1,2}-\d{1,2})',  # YYYY-MM-DD
+    r'([A-Za-z]+ \d{1,2},? \d{4})',  # Month DD, YYYY
+    r'(\d{1,2} [A-Za-z]+ \d{4})',  # DD Month YYYY
+    r'([A-Za-z]+ \d{4})',  # Month YYYY
+]]
+SCORE_AMOUNT_RES = [re.compile(pattern) for pattern in [
+    r'\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',  # $123.45 or $1,234.56
+    r'(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)\s*(?:dollars?|USD|\$)',  # 123.45 dollars
+]]
+# Wildcard gaps are bounded so each scan stays linear on long lines / DOTALL text
+SCORE_DASHBOARD_RES = [re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in [
+    # Look for "PAID on Date" followed by amount nearby
+    r'(?:paid|due|bill)\s+(?:on|date)?\s*([A-Za-z]+ \d{1,2},? \d{4}).{0,200}?\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
+    r'\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?).{0,200}?(?:paid|due|on)\s+([A-Za-z]+ \d{1,2},? \d{4})',
+    # Look for amount followed by date
+    r'(?:amount|bill|payment).{0,200}?\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?).{0,200}?(\d{1,2}/\d{1,2}/\d{4})',
+]]
+SCORE_CURRENT_BILL_RES = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r'current.{0,100}bill.{0,100}amount.{0,100}\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
+    r'amount.{0,100}due.{0,100}\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
+    r'balance.{0,100}\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
+    # Enhanced patterns for dashboard billing
+    r'bill.{0,100}amount.{0,100}\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
+    r'paid.{0,100}\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
+    r'payment.{0,100}\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
+]]
+
+# Navigation keywords used to pick up text-only clickables (built once, not per element)
+NAV_KEYWORD_RE = re.compile('|'.join(re.escape(keyword) for keyword in HIGH_PRIORITY_NAV + MEDIUM_PRIORITY_NAV), re.IGNORECASE)
+
+# URL fragments that mark a billing link / a registration redirect
+HREF_BILLING_RE = re.compile(r'billing|transaction|history', re.IGNORECASE)
+REGISTRATION_URL_RE = re.compile(r'registration|register|setup', re.IGNORECASE)
+
+# Any term that can add to a link's billing score - links matching none skip the per-term scoring loops
+NAV_TERM_RE = re.compile('|'.join(re.escape(term) for term in sorted(
+    set(HIGH_PRIORITY_NAV + MEDIUM_PRIORITY_NAV + LOW_PRIORITY_NAV + ['billing', 'transaction', 'history']),
+    key=len, reverse=True
+)), re.IGNORECASE)
+
+# Returns [element, visible text] for every clickable element whose text contains a keyword (one round-trip)
+BILLING_CLICKABLES_JS = """
+var keywords = arguments[0];
+var matches = [];
+document.querySelectorAll('[onclick], [ng-click], [routerlink], button, a').forEach(function (element) {
+    var text = (element.innerText || '').trim().toUpperCase();
+    if (keywords.some(function (keyword) { return text.indexOf(keyword) !== -1; })) {
+        matches.push([element, text]);
+    }
+});
+return matches;
+"""
+
+# First billing-related element among the first 3 matches of each sidebar selector, as
+# [element, text, selector]; after an earlier expansion only the first non-empty selector is checked
+SIDEBAR_BILLING_ELEMENT_JS = """
+var selectors = arguments[0];
+var keywords = arguments[1];
+var firstSelectorOnly = arguments[2];
+for (var i = 0; i < selectors.length; i++) {
+    var elements = document.querySelectorAll(selectors[i]);
+    for (var j = 0; j < Math.min(elements.length, 3); j++) {
+        var text = (elements[j].innerText || '').trim();
+        var upper = text.toUpperCase();
+        if (keywords.some(function (keyword) { return upper.indexOf(keyword) !== -1; })) {
+            return [elements[j], text, selectors[i]];
+        }
+    }
+    if (firstSelectorOnly && elements.length) {
+        return null;
+    }
+}
+return null;
+"""
+
+# Clickable-element count and body markup length - differs once a click renders a menu or new view
+DOM_SNAPSHOT_JS = """
+return [document.querySelectorAll('a, button, [role="menuitem"]').length,
+        document.body ? document.body.innerHTML.length : 0];
+"""
+
+# Sort key for scored link dicts (C-level lookup instead of a lambda call per link)
+BY_SCORE = itemgetter('score')
+
+# Dropdown trigger candidates: elements whose own text contains a trigger, with their parent and
+# whether either carries a dropdown class or aria-expanded state (all read in one round-trip)
+DROPDOWN_CLASS_INDICATORS = ['dropdown', 'collapse', 'toggle', 'expand', 'menu', 'nav-item', 'mat-', 'angular']
+DROPDOWN_TRIGGERS_JS = """
+var triggers = arguments[0];
+var indicators = arguments[1];
+var candidates = [];
+triggers.forEach(function (trigger) {
+    var found = document.evaluate("//*[contains(text(), '" + trigger + "')]", document, null,
+                                  XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (var i = 0; i < found.snapshotLength; i++) {
+        var element = found.snapshotItem(i);
+        var parent = element.parentElement || element;
+        var classes = ((element.getAttribute('class') || '') + ' ' + (parent.getAttribute('class') || '')).toLowerCase();
+        candidates.push([
+            trigger, element, parent,
+            indicators.some(function (indicator) { return classes.indexOf(indicator) !== -1; }),
+            element.getAttribute('aria-expanded'), parent.getAttribute('aria-expanded')
+        ]);
+    }
+});
+return candidates;
+"""
 
 class NavigationAgent:
     """AI-powered intelligent navigation and exploration agent for billing sites"""
@@ -28,21 +147,101 @@ class NavigationAgent:
     def __init__(self, driver):
         """Initialize the navigation agent with a WebDriver instance"""
         self.driver = driver
-        self.visited_urls: Set[str] = set()
+        self.visited_urls: Set[str] = set()  # canonical_url() forms
         
         # Import other agents to avoid circular dependency
         from .billing_evaluator import BillingDataEvaluator
         from .exploration_strategist import ExplorationStrategist
         self.billing_evaluator = BillingDataEvaluator()
         self.exploration_strategist = ExplorationStrategist()
+        # AI evaluation only needs page HTML, so it runs alongside extraction (which uses the driver)
+        self._evaluation_pool = ThreadPoolExecutor(max_workers=1)
+        # Quality score per page HTML hash - scoring often sees the same page twice; LRU-capped at PAGE_CACHE_SIZE
+        self._page_scores: OrderedDict = OrderedDict()
+        # Visible-text fingerprints of explored pages - catches the same page served again, including under
+        # another URL (session ids, tracking params, redirects back to the dashboard), before it is re-analyzed
+        self._visited_fingerprints: Set[bytes] = set()
+        # Last driver.page_source read - a full DOM serialization, so reused until the agent navigates or clicks
+        self._page_source: Optional[str] = None
+    
+    def _read_page_source(self) -> str:
+        """Current page HTML, reusing the last read while nothing has navigated or been clicked"""
+        if self._page_source is None:
+            self._page_source = self.driver.page_source
+        return self._page_source
+    
+    def _mark_page_changed(self):
+        """Drop the reused page HTML after a navigation or click"""
+        self._page_source = None
+    
+    @staticmethod
+    def _page_key(page_source: str) -> bytes:
+        """Short content hash identifying a page's HTML"""
+        return hashlib.blake2b(page_source.encode('utf-8'), digest_size=16).digest()
+    
+    @staticmethod
+    def _page_fingerprint(page_source: str) -> bytes:
+        """Hash of a page's whitespace-normalized visible text (ignores markup-only differences)"""
+        page_text = WHITESPACE_RE.sub(' ', get_page_text(page_source)).strip()
+        return hashlib.blake2b(page_text.encode('utf-8'), digest_size=16).digest()
+    
+    @staticmethod
+    def _remember_page(cache: OrderedDict, page_key: bytes, value):
+        """Store a per-page result, evicting the least recently used page when full"""
+        cache[page_key] = value
+        if len(cache) > PAGE_CACHE_SIZE:
+            cache.popitem(last=False)
+        return value
+    
+    def close(self):
+        """Stop the evaluation pool, dropping any AI evaluation that hasn't started yet"""
+        self._evaluation_pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _start_evaluation(self, page_source: str):
+        """Start the AI sufficiency evaluation in the background and return its future"""
+        return self._evaluation_pool.submit(self.billing_evaluator.evaluate_page_sufficiency, page_source)
+    
+    def _analyze_page(self, page_source: str, extraction_orchestrator, is_billing_page: bool) -> tuple:
+        """Extract and AI-evaluate a page (extraction overlaps the AI evaluation)"""
+        # AI Evaluation: Does this page have sufficient billing data (4+ months)?
+        # ALWAYS used (even if extraction succeeds), so start it before extracting.
+        # It only reads visible text, so the main content region is enough.
+        evaluation_future = self._start_evaluation(get_relevant_html(self.driver, MAIN_CONTENT_HTML_JS))
+        
+        # Extract data
+        billing_data = extraction_orchestrator.extract_billing_data(page_source, self.driver, is_billing_page)
+        
+        print(f"📊 Basic extraction complete, waiting for AI evaluation for quality assessment...")
+        return billing_data, evaluation_future.result()
+    
+    def _settled_new_page(self) -> Optional[str]:
+        """Page HTML once its content differs from every explored page, or None if it stays a repeat
+        
+        An SPA route can still show the previous view right after wait_for_spa_content, so a repeat
+        gets SPA_RERENDER_WAIT seconds to re-render before it is treated as the same page.
+        """
+        def new_page_source(_):
+            page_source = self._read_page_source()
+            if self._page_fingerprint(page_source) not in self._visited_fingerprints:
+                return page_source
+            self._mark_page_changed()  # Re-read on the next poll
+            return None
+        
+        try:
+            page_source = WebDriverWait(self.driver, SPA_RERENDER_WAIT, poll_frequency=0.25).until(new_page_source)
+        except TimeoutException:
+            return None
+        self._visited_fingerprints.add(self._page_fingerprint(page_source))
+        return page_source
     
     def explore_for_billing_data(self, extraction_orchestrator) -> 'BillInfo':
         """Main exploration method that systematically finds billing data"""
         print("🧭 Starting systematic billing exploration...")
         
         start_time = time.time()
+        self._mark_page_changed()  # Login/navigation happened outside the agent since the last run
         current_url = self.driver.current_url
-        self.visited_urls.add(current_url)
+        self.visited_urls.add(canonical_url(current_url))
         
         # Check for registration redirect first
         if self._check_registration_redirect():
@@ -51,13 +250,17 @@ class NavigationAgent:
         
         # ENHANCED: Try dashboard extraction on main page first
         print("🏠 Checking main dashboard for billing data...")
-        main_page_source = self.driver.page_source
-        dashboard_result = extraction_orchestrator.extract_billing_data(main_page_source, self.driver, False)
+        main_page_source = self._read_page_source()  # Same read as the registration check
+        self._visited_fingerprints.add(self._page_fingerprint(main_page_source))
         
         # NEW: Score the page for billing quality based on date-amount pairs
         billing_score = self._score_billing_page_quality(main_page_source)
         print(f"📊 Billing page score: {billing_score}/100")
         
+        # Low-scoring pages always need the AI evaluation - overlap it with extraction
+        evaluation_future = self._start_evaluation(main_page_source) if billing_score < 85 else None
+        dashboard_result = extraction_orchestrator.extract_billing_data(main_page_source, self.driver, False)
+        
         # If score >= 85, this is a good billing page - stop and extract
         if billing_score >= 85:
             print(f"🎯 High billing score ({billing_score}) - this page has sufficient billing data!")
@@ -66,9 +269,16 @@ class NavigationAgent:
                 return dashboard_result
             else:
                 print("⚠️ High score but no extractable data - continuing exploration...")
+                evaluation_future = self._start_evaluation(main_page_source)
+        
+        # Enough history extracted already - don't wait on the AI evaluation
+        if self._has_sufficient_bills(dashboard_result):
+            print(f"🏠 Dashboard extraction found {len(dashboard_result.all_bills)} bills - using dashboard extraction")
+            evaluation_future.cancel()  # Only stops it if it hasn't started; close() drops the pool
+            return dashboard_result
         
         # Use AI evaluation to check if dashboard data is sufficient (fallback)
-        ai_evaluation = self.billing_evaluator.evaluate_page_sufficiency(main_page_source)
+        ai_evaluation = evaluation_future.result()
         
         if ai_evaluation.get('has_sufficient_billing_data'):
             months_found = ai_evaluation.get('months_of_data_found', 0)
@@ -125,10 +335,10 @@ class NavigationAgent:
     def _check_registration_redirect(self) -> bool:
         """Check if we've been redirected to a registration page"""
         current_url = self.driver.current_url
-        page_source = self.driver.page_source.lower()
+        page_source = self._read_page_source().lower()
         
         # Check URL patterns
-        if any(term in current_url.lower() for term in ["registration", "register", "setup"]):
+        if REGISTRATION_URL_RE.search(current_url):
             print("⚠️ Detected registration/setup redirect")
             return True
         
@@ -155,11 +365,11 @@ class NavigationAgent:
         # ENHANCED: Try to expand dropdown menus first
         self._try_expand_dropdown_menus()
         
-        soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+        soup = parse_html(self.driver.page_source)
         elements = self._find_clickable_elements(soup)
         
         current_url = self.driver.current_url
-        base_domain = '/'.join(current_url.split('/')[:3])
+        base_domain = get_base_url(current_url)
         
         billing_links = []
         
@@ -177,8 +387,7 @@ class NavigationAgent:
         # Show top 5 discovered links
         if billing_links:
             print("🏆 Top discovered links:")
-            sorted_links = sorted(billing_links, key=lambda x: x['score'], reverse=True)
-            for i, link in enumerate(sorted_links[:5]):
+            for i, link in enumerate(heapq.nlargest(5, billing_links, key=BY_SCORE)):
                 print(f"   {i+1}. '{link['text']}' (score: {link['score']})")
                 print(f"      → {link['url']}")
         else:
@@ -199,56 +408,35 @@ class NavigationAgent:
             expanded_any = False
             
             # Method 1: Find by exact text content
-            for trigger_text in dropdown_triggers:
-                try:
-                    print(f"   🔍 Looking for dropdown trigger: '{trigger_text}'")
-                    
-                    # Find elements with this text that might be dropdown triggers
-                    elements = self.driver.find_elements(By.XPATH, f"//*[contains(text(), '{trigger_text}')]")
-                    print(f"       Found {len(elements)} elements with text '{trigger_text}'")
-                    
-                    for element in elements:
-                        try:
-                            # Check if this element or its parent has dropdown indicators
-                            parent = element.find_element(By.XPATH, "./..")
-                            element_classes = element.get_attribute("class") or ""
-                            parent_classes = parent.get_attribute("class") or ""
-                            
-                            print(f"       Element classes: '{element_classes}'")
-                            print(f"       Parent classes: '{parent_classes}'")
-                            
-                            # Look for dropdown indicators
-                            is_dropdown = any(indicator in (element_classes + " " + parent_classes).lower() for indicator in [
-                                'dropdown', 'collapse', 'toggle', 'expand', 'menu', 'nav-item', 'mat-', 'angular'
-                            ])
-                            
-                            # Check for aria-expanded attribute
-                            aria_expanded = element.get_attribute("aria-expanded")
-                            parent_aria_expanded = parent.get_attribute("aria-expanded")
-                            
-                            print(f"       Is dropdown: {is_dropdown}, aria-expanded: {aria_expanded}/{parent_aria_expanded}")
-                            
-                            if is_dropdown or aria_expanded == "false" or parent_aria_expanded == "false":
-                                print(f"   🔽 Clicking dropdown trigger: '{trigger_text}'")
-                                
-                                # Try clicking the element
-                                self.driver.execute_script("arguments[0].click();", element)
-                                
-                                # Wait a moment for dropdown to expand
-                                import time
-                                time.sleep(2)
-                                
-                                expanded_any = True
-                                print(f"       ✅ Successfully clicked '{trigger_text}'")
-                                break
-                                
-                        except Exception as e:
-                            print(f"       ❌ Error clicking element: {e}")
-                            continue
-                            
-                except Exception as e:
-                    print(f"   ❌ Error finding '{trigger_text}': {e}")
+            # One script call gathers every trigger element with its parent and dropdown state,
+            # instead of an XPath lookup plus parent/class/aria-expanded round-trips per element
+            try:
+                candidates = self.driver.execute_script(
+                    DROPDOWN_TRIGGERS_JS, dropdown_triggers, DROPDOWN_CLASS_INDICATORS
+                ) or []
+            except Exception as e:
+                print(f"   ❌ Error finding dropdown triggers: {e}")
+                candidates = []
+            print(f"   🔍 Found {len(candidates)} elements matching dropdown triggers")
+            
+            clicked_triggers = set()
+            for trigger_text, element, parent, is_dropdown, aria_expanded, parent_aria_expanded in candidates:
+                if trigger_text in clicked_triggers:
                     continue
+                if is_dropdown or aria_expanded == "false" or parent_aria_expanded == "false":
+                    try:
+                        print(f"   🔽 Clicking dropdown trigger: '{trigger_text}'")
+                        
+                        # Click and wait for the menu to render
+                        self._click_and_wait_for_change(element)
+                        
+                        expanded_any = True
+                        clicked_triggers.add(trigger_text)
+                        print(f"       ✅ Successfully clicked '{trigger_text}'")
+                        
+                    except Exception as e:
+                        print(f"       ❌ Error clicking element: {e}")
+                        continue
             
             # Method 2: Find sidebar elements by CSS selectors
             sidebar_selectors = [
@@ -263,50 +451,31 @@ class NavigationAgent:
             ]
             
             print(f"   🔍 Trying CSS selectors for sidebar elements...")
-            for selector in sidebar_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if elements:
-                        print(f"       Found {len(elements)} elements with selector '{selector}'")
-                        
-                        for element in elements[:3]:  # Check first 3 elements
-                            try:
-                                element_text = element.text.strip()
-                                if any(trigger in element_text.upper() for trigger in ["BILL", "PAY", "BILLING", "USAGE"]):
-                                    print(f"       🎯 Found billing-related sidebar element: '{element_text}'")
-                                    print(f"       Clicking sidebar element...")
-                                    
-                                    self.driver.execute_script("arguments[0].click();", element)
-                                    time.sleep(2)
-                                    expanded_any = True
-                                    print(f"       ✅ Successfully clicked sidebar element")
-                                    break
-                            except Exception as e:
-                                print(f"       ❌ Error with sidebar element: {e}")
-                                continue
-                        
-                        if expanded_any:
-                            break
-                            
-                except Exception as e:
-                    print(f"       ❌ Error with selector '{selector}': {e}")
-                    continue
+            try:
+                # Texts of the first 3 elements per selector are read in the page, not one WebDriver call each
+                match = self.driver.execute_script(
+                    SIDEBAR_BILLING_ELEMENT_JS, sidebar_selectors, ["BILL", "PAY", "BILLING", "USAGE"], expanded_any
+                )
+                if match:
+                    element, element_text, selector = match
+                    print(f"       🎯 Found billing-related sidebar element: '{element_text}' (selector '{selector}')")
+                    print(f"       Clicking sidebar element...")
+                    
+                    self._click_and_wait_for_change(element)
+                    expanded_any = True
+                    print(f"       ✅ Successfully clicked sidebar element")
+                    
+            except Exception as e:
+                print(f"       ❌ Error with sidebar elements: {e}")
             
             # Method 3: Find all clickable elements and check their text
             if not expanded_any:
                 print(f"   🔍 Scanning all clickable elements for billing keywords...")
                 try:
-                    all_clickable = self.driver.find_elements(By.XPATH, "//*[@onclick or @ng-click or @routerlink or name()='button' or name()='a']")
-                    print(f"       Found {len(all_clickable)} total clickable elements")
-                    
-                    billing_elements = []
-                    for element in all_clickable:
-                        try:
-                            element_text = element.text.strip().upper()
-                            if any(keyword in element_text for keyword in ["BILL", "PAY", "BILLING", "USAGE", "ACCOUNT"]):
-                                billing_elements.append((element, element_text))
-                        except:
-                            continue
+                    # Filter in the page so element text isn't fetched one WebDriver call at a time
+                    billing_elements = self.driver.execute_script(
+                        BILLING_CLICKABLES_JS, ["BILL", "PAY", "BILLING", "USAGE", "ACCOUNT"]
+                    ) or []
                     
                     print(f"       Found {len(billing_elements)} elements with billing keywords:")
                     for element, text in billing_elements[:5]:  # Show first 5
@@ -316,8 +485,7 @@ class NavigationAgent:
                     if billing_elements:
                         element, text = billing_elements[0]
                         print(f"   🔽 Clicking first billing element: '{text}'")
-                        self.driver.execute_script("arguments[0].click();", element)
-                        time.sleep(2)
+                        self._click_and_wait_for_change(element)
                         expanded_any = True
                         
                 except Exception as e:
@@ -332,6 +500,24 @@ class NavigationAgent:
         except Exception as e:
             print(f"   ❌ Error expanding dropdowns: {e}")
     
+    def _click_and_wait_for_change(self, element, timeout: int = 2):
+        """Click an element, then wait up to timeout seconds for the page to change"""
+        before = self.driver.execute_script(DOM_SNAPSHOT_JS)
+        self.driver.execute_script("arguments[0].click();", element)
+        self._mark_page_changed()
+        
+        def page_changed(driver):
+            try:
+                element.is_enabled()
+            except StaleElementReferenceException:
+                return True  # The clicked element was replaced by a re-render
+            return driver.execute_script(DOM_SNAPSHOT_JS) != before
+        
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.25).until(page_changed)
+        except TimeoutException:
+            pass  # Nothing visibly changed within the bounded wait - carry on
+    
     def _find_clickable_elements(self, soup) -> List:
         """Find all potentially clickable elements"""
         elements = []
@@ -347,13 +533,12 @@ class NavigationAgent:
         elements.extend(soup.find_all(attrs={'routerlink': True}))
         elements.extend(soup.find_all(attrs={'ui-sref': True}))
         
-        # Elements with billing-related text
-        all_elements = soup.find_all(['a', 'button', 'div', 'span', 'li'])
-        for element in all_elements:
-            text = element.get_text(strip=True).lower()
-            if any(keyword in text for keyword in HIGH_PRIORITY_NAV + MEDIUM_PRIORITY_NAV):
-                if element not in elements:
-                    elements.append(element)
+        # Elements with billing-related text (identity check - Tag equality compares whole subtrees)
+        seen = {id(element) for element in elements}
+        for element in soup.find_all(['a', 'button', 'div', 'span', 'li']):
+            if id(element) not in seen and NAV_KEYWORD_RE.search(element.get_text(strip=True)):
+                seen.add(id(element))
+                elements.append(element)
         
         return elements
     
@@ -377,7 +562,7 @@ class NavigationAgent:
             # Construct URL
             full_url = self._construct_full_url(element, base_domain)
             
-            if not full_url or full_url in self.visited_urls:
+            if not full_url or canonical_url(full_url) in self.visited_urls:
                 return None
             
             return {
@@ -392,21 +577,26 @@ class NavigationAgent:
             return None
     
     def _calculate_billing_score(self, text: str, href: str) -> int:
-        """Calculate relevance score for billing content"""
+        """Calculate relevance score for billing content (text is already lowercased)"""
+        # One prefilter scan over both; \x00 keeps a term from matching across the join
+        if not NAV_TERM_RE.search(f"{text}\x00{href}"):
+            return 0  # Most links ("Home", "Contact us") mention no billing term at all
+        
         score = 0
+        href_lower = href.lower()
         
         # High priority terms
         for term in HIGH_PRIORITY_NAV:
             if term in text:
                 score += 50
-            if term in href.lower():
+            if term in href_lower:
                 score += 30
         
         # Medium priority terms
         for term in MEDIUM_PRIORITY_NAV:
             if term in text:
                 score += 30
-            if term in href.lower():
+            if term in href_lower:
                 score += 20
         
         # Low priority terms
@@ -415,7 +605,7 @@ class NavigationAgent:
                 score += 15
         
         # URL-based scoring
-        if any(pattern in href.lower() for pattern in ['billing', 'transaction', 'history']):
+        if HREF_BILLING_RE.search(href_lower):
             score += 40
         
         return min(score, 100)
@@ -463,7 +653,7 @@ class NavigationAgent:
     
     def _try_common_billing_patterns(self) -> List[Dict]:
         """Try common billing URL patterns when no links found"""
-        base_url = '/'.join(self.driver.current_url.split('/')[:3])
+        base_url = get_base_url(self.driver.current_url)
         pattern_links = []
         
         for pattern in COMMON_BILLING_PATTERNS:
@@ -494,37 +684,13 @@ class NavigationAgent:
                     'score': link['score']
                 })
             
-            prompt = f"""
-            You are a utility billing expert. Rank these links by billing relevance. RETURN ONLY JSON.
-
-            LINKS TO RANK:
-            {json.dumps(links_for_ai, indent=2)}
-
-            RANKING CRITERIA:
-            - 90-100: Transaction/billing/payment history, statements
-            - 70-89: Account details, usage data, bills  
-            - 50-69: Dashboard, overview
-            - 0-49: Settings, help, non-billing
-
-            RETURN ONLY THIS JSON FORMAT:
-            {{
-                "ranked_links": [
-                    {{
-                        "url": "full_url", 
-                        "score": 95,
-                        "reasoning": "transaction history page"
-                    }}
-                ]
-            }}
-            """
-            
-            response = ollama.chat(
-                model=OLLAMA_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                options={
-                    "temperature": 0.1,
-                    "num_predict": 800
-                }
+            messages = PromptLibrary.get_messages('billing_link_ranking', links_data=json.dumps(links_for_ai, indent=2))
+            
+            # Stop decoding as soon as the JSON answer is complete (skips trailing commentary)
+            response = llm_client.chat_json(
+                model=llm_client.fast_model,
+                messages=messages,
+                options={**LLM_EXTRACT_OPTIONS, "num_predict": 800}
             )
             
             response_content = response["message"]["content"]
@@ -535,7 +701,7 @@ class NavigationAgent:
                 result = json.loads(response_content)
             except json.JSONDecodeError:
                 # Try to extract JSON from response
-                json_match = re.search(r'\{.*\}', response_content, re.DOTALL)
+                json_match = JSON_OBJECT_RE.search(response_content)
                 if json_match:
                     result = json.loads(json_match.group())
                 else:
@@ -582,11 +748,11 @@ class NavigationAgent:
                 elif 'account' in text or 'usage' in text:
                     link['score'] = 70
             
-            # Sort by enhanced scores
-            enhanced_links = sorted(billing_links, key=lambda x: x['score'], reverse=True)
+            # Top 5 by enhanced score (same order as a full descending sort)
+            enhanced_links = heapq.nlargest(5, billing_links, key=BY_SCORE)
             print(f"🎯 Fallback ranking: Top link is '{enhanced_links[0]['text']}' (score: {enhanced_links[0]['score']})")
             
-            return enhanced_links[:5]
+            return enhanced_links
     
     def _explore_links_with_scoring(self, ranked_links: List[Dict], extraction_orchestrator, start_time: float) -> 'BillInfo':
         """Systematically explore billing links with page scoring to stop early if good data found"""
@@ -609,7 +775,7 @@ class NavigationAgent:
             print(f"🎯 Exploring {i+1}/{len(ranked_links)}: {url}")
             print(f"⏱️  Time: {elapsed:.1f}s/{MAX_EXPLORATION_TIME}s")
             
-            if url in self.visited_urls:
+            if canonical_url(url) in self.visited_urls:
                 print("⏭️  Already visited, skipping...")
                 continue
                 
@@ -617,8 +783,13 @@ class NavigationAgent:
                 result = self._explore_single_link(url, link, extraction_orchestrator, start_time)
                 
                 if result and has_meaningful_billing_data(result):
-                    # Score this page for billing quality
-                    page_source = self.driver.page_source
+                    # Enough history already extracted - skip re-reading and scoring the page
+                    if self._has_sufficient_bills(result):
+                        print(f"🎯 Extracted {len(result.all_bills)} bills - stopping exploration!")
+                        return result
+                    
+                    # Score this page for billing quality (same HTML unless AI sub-exploration navigated away)
+                    page_source = self._read_page_source()
                     billing_score = self._score_billing_page_quality(page_source)
                     
                     print(f"📊 Page billing score: {billing_score}/100")
@@ -647,29 +818,33 @@ class NavigationAgent:
             from utils import BillInfo
             return BillInfo("No meaningful data found", 0.0, "Exploration completed", 0.0)
     
+    @staticmethod
+    def _has_sufficient_bills(result) -> bool:
+        """True when an extraction already holds enough bills to end exploration"""
+        return len(getattr(result, 'all_bills', None) or []) >= SUFFICIENT_BILL_COUNT
+    
     def _explore_single_link(self, url: str, link_info: Dict, extraction_orchestrator, start_time: float = None) -> 'BillInfo':
         """Explore a single link and extract billing data."""
         print(f"🔗 Navigating to: {url}")
         
         try:
             self.driver.get(url)
+            self._mark_page_changed()
             wait_for_spa_content(self.driver)
-            self.visited_urls.add(url)
+            self.visited_urls.add(canonical_url(url))
+            
+            # Same content as a page already explored (after SPA content settled) - nothing new to extract
+            page_source = self._settled_new_page()
+            if page_source is None:
+                print("⏭️  Same content as an already explored page, skipping...")
+                return None
             
             # Check if this is a billing history page
-            page_source = self.driver.page_source
             is_billing_page = self._is_billing_history_page(page_source)
             
             print(f"�� Billing page: {is_billing_page}")
             
-            # Extract data
-            billing_data = extraction_orchestrator.extract_billing_data(page_source, self.driver, is_billing_page)
-            
-            # ALWAYS use AI evaluation to determine data sufficiency (even if extraction succeeded)
-            print(f"📊 Basic extraction complete, now using AI evaluation for quality assessment...")
-            
-            # AI Evaluation: Does this page have sufficient billing data (4+ months)?
-            ai_evaluation = self.billing_evaluator.evaluate_page_sufficiency(page_source)
+            billing_data, ai_evaluation = self._analyze_page(page_source, extraction_orchestrator, is_billing_page)
             
             if ai_evaluation.get('has_sufficient_billing_data'):
                 months_found = ai_evaluation.get('months_of_data_found', 0)
@@ -706,15 +881,13 @@ class NavigationAgent:
                     if next_links:
                         print(f"🔗 AI recommends exploring {len(next_links)} additional links:")
                         
-                        # Sort by AI priority and explore top links
-                        sorted_links = sorted(next_links, key=lambda x: x.get('priority', 0), reverse=True)
-                        
-                        for j, ai_link in enumerate(sorted_links[:3]):  # Limit to top 3 AI recommendations
+                        # Explore the top 3 AI recommendations by priority
+                        for j, ai_link in enumerate(heapq.nlargest(3, next_links, key=lambda x: x.get('priority', 0))):
                             if start_time and time.time() - start_time > MAX_EXPLORATION_TIME:
                                 break
                                         
                             ai_url = ai_link.get('url')
-                            if not ai_url or ai_url in self.visited_urls:
+                            if not ai_url or canonical_url(ai_url) in self.visited_urls:
                                 continue
                                         
                             ai_text = ai_link.get('text', 'Unknown')
@@ -727,8 +900,9 @@ class NavigationAgent:
                             
                             try:
                                 self.driver.get(ai_url)
+                                self._mark_page_changed()
                                 wait_for_spa_content(self.driver)
-                                self.visited_urls.add(ai_url)
+                                self.visited_urls.add(canonical_url(ai_url))
                                 
                                 # Try extraction on AI-recommended page
                                 sub_page_source = self.driver.page_source
@@ -775,15 +949,14 @@ class NavigationAgent:
             'statement history'
         ]
         
-        # Look for table structures with billing data
-        table_indicators = [
-            '<table' in page_text and 'amount' in page_text,
-            '<table' in page_text and 'date' in page_text,
-            'billing' in page_text and 'amount' in page_text
-        ]
+        if any(indicator in page_text for indicator in history_indicators):
+            return True
         
-        return (any(indicator in page_text for indicator in history_indicators) or
-                any(table_indicators))
+        # Look for table structures with billing data (each substring searched at most once, only if needed)
+        has_amount = 'amount' in page_text
+        if '<table' in page_text and (has_amount or 'date' in page_text):
+            return True
+        return has_amount and 'billing' in page_text
     
     def _common_billing_patterns(self, base_url: str) -> List[str]:
         """Generate common billing URL patterns."""
@@ -793,6 +966,15 @@ class NavigationAgent:
         return patterns 
 
     def _score_billing_page_quality(self, page_source: str) -> int:
+        """Score a page for billing data quality, reusing the score for HTML already scored this session"""
+        page_key = self._page_key(page_source)
+        if page_key in self._page_scores:
+            self._page_scores.move_to_end(page_key)
+            print(f"♻️ Page already scored this session: {self._page_scores[page_key]}/100")
+            return self._page_scores[page_key]
+        return self._remember_page(self._page_scores, page_key, self._compute_page_score(page_source))
+    
+    def _compute_page_score(self, page_source: str) -> int:
         """Score a page for billing data quality based on date-amount pairs
         
         Criteria:
@@ -803,76 +985,41 @@ class NavigationAgent:
         print("📊 Scoring page for billing data quality...")
         
         try:
-            from bs4 import BeautifulSoup
-            import re
             from datetime import datetime
             
-            soup = BeautifulSoup(page_source, 'html.parser')
-            page_text = soup.get_text()
+            soup = parse_html(page_source)
+            page_text = get_page_text(page_source)
             
             # Find date-amount pairs
             date_amount_pairs = []
             
-            # Enhanced date patterns
-            date_patterns = [
-                r'(\d{1,2}/\d{1,2}/\d{4})',  # MM/DD/YYYY
-                r'(\d{4}-\d{1,2}-\d{1,2})',  # YYYY-MM-DD
-                r'([A-Za-z]+ \d{1,2},? \d{4})',  # Month DD, YYYY
-                r'(\d{1,2} [A-Za-z]+ \d{4})',  # DD Month YYYY
-                r'([A-Za-z]+ \d{4})',  # Month YYYY
-            ]
-            
-            # Enhanced amount patterns (look for currency amounts)
-            amount_patterns = [
-                r'\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',  # $123.45 or $1,234.56
-                r'(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)\s*(?:dollars?|USD|\$)',  # 123.45 dollars
-            ]
-            
-            # Look for structured data first (tables, lists)
-            tables = soup.find_all('table')
-            for table in tables:
-                rows = table.find_all('tr')
-                for row in rows:
-                    row_text = row.get_text()
-                    dates_in_row = []
-                    amounts_in_row = []
-                    
-                    # Find dates in this row
-                    for date_pattern in date_patterns:
-                        dates_in_row.extend(re.findall(date_pattern, row_text))
-                    
-                    # Find amounts in this row
-                    for amount_pattern in amount_patterns:
-                        amounts_in_row.extend(re.findall(amount_pattern, row_text))
-                    
-                    # If we found both dates and amounts in the same row, it's likely billing data
-                    if dates_in_row and amounts_in_row:
-                        for date_str in dates_in_row:
-                            for amount_str in amounts_in_row:
-                                try:
-                                    amount = float(amount_str.replace(',', ''))
-                                    if 5.0 <= amount <= 5000.0:  # Reasonable utility bill range
-                                        date_amount_pairs.append({
-                                            'date': date_str,
-                                            'amount': amount,
-                                            'source': 'table_row'
-                                        })
-                                        print(f"   📋 Found table entry: {date_str} → ${amount:.2f}")
-                                except:
-                                    continue
+            # Look for structured data first - every table row once (nested tables would repeat rows)
+            for row in soup.find_all('tr'):
+                row_text = row.get_text()
+                amounts_in_row = [amount for amount_re in SCORE_AMOUNT_RES for amount in amount_re.findall(row_text)]
+                if not amounts_in_row:
+                    continue
+                dates_in_row = [date for date_re in SCORE_DATE_RES for date in date_re.findall(row_text)]
+                
+                # If we found both dates and amounts in the same row, it's likely billing data
+                if dates_in_row and amounts_in_row:
+                    for date_str in dates_in_row:
+                        for amount_str in amounts_in_row:
+                            try:
+                                amount = float(amount_str.replace(',', ''))
+                                if 5.0 <= amount <= 5000.0:  # Reasonable utility bill range
+                                    date_amount_pairs.append({
+                                        'date': date_str,
+                                        'amount': amount,
+                                        'source': 'table_row'
+                                    })
+                                    print(f"   📋 Found table entry: {date_str} → ${amount:.2f}")
+                            except:
+                                continue
             
             # Look for dashboard-style date-amount pairs
-            dashboard_patterns = [
-                # Look for "PAID on Date" followed by amount nearby
-                r'(?:paid|due|bill)\s+(?:on|date)?\s*([A-Za-z]+ \d{1,2},? \d{4}).*?\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                r'\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?).*?(?:paid|due|on)\s+([A-Za-z]+ \d{1,2},? \d{4})',
-                # Look for amount followed by date
-                r'(?:amount|bill|payment).*?\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?).*?(\d{1,2}/\d{1,2}/\d{4})',
-            ]
-            
-            for pattern in dashboard_patterns:
-                matches = re.finditer(pattern, page_text, re.IGNORECASE | re.DOTALL)
-                for match in matches:
+            for dashboard_re in SCORE_DASHBOARD_RES:
+                for match in dashboard_re.finditer(page_text):
                     try:
                         groups = match.groups()
                         if len(groups) == 2:
@@ -895,22 +1042,11 @@ class NavigationAgent:
                         continue
             
             # Look for current bill amounts with implied current date
-            current_bill_patterns = [
-                r'current.*bill.*amount.*\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                r'amount.*due.*\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                r'balance.*\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                # Enhanced patterns for dashboard billing
-                r'bill.*amount.*\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                r'paid.*\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                r'payment.*\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-            ]
-            
             current_date = datetime.now().strftime('%m/%d/%Y')
             current_bill_count = 0
             
-            for pattern in current_bill_patterns:
-                matches = re.findall(pattern, page_text, re.IGNORECASE)
-                for amount_str in matches:
+            for current_bill_re in SCORE_CURRENT_BILL_RES:
+                for amount_str in current_bill_re.findall(page_text):
                     try:
                         amount = float(amount_str.replace(',', ''))
                         if 5.0 <= amount <= 5000.0:
@@ -919,7 +1055,7 @@ class NavigationAgent:
                             pseudo_date = datetime.now()
                             pseudo_date = pseudo_date.replace(day=min(28, pseudo_date.day + current_bill_count - 1))
                             date_str = pseudo_date.strftime('%m/%d/%Y')
-                            
+                        
                             date_amount_pairs.append({
                                 'date': date_str,
                                 'amount': amount,
@@ -928,7 +1064,7 @@ class NavigationAgent:
                             print(f"   💳 Found current bill: {date_str} → ${amount:.2f}")
                     except:
                         continue
-            
+        
             # Remove duplicates with enhanced logic for dashboard pages
             unique_pairs = []
             seen_combinations = set()
@@ -951,7 +1087,8 @@ class NavigationAgent:
             
             # Base score for having billing-related content
             billing_keywords = ['bill', 'payment', 'amount', 'due', 'balance', 'paid', 'current']
-            keyword_count = sum(1 for keyword in billing_keywords if keyword in page_text.lower())
+            page_text_lc = page_text.lower()
+            keyword_count = sum(1 for keyword in billing_keywords if keyword in page_text_lc)
             if keyword_count >= 3:
                 score += 30
                 print(f"   ✅ +30 points: Contains {keyword_count} billing keywords")
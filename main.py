@@ -4,346 +4,604 @@ AutoBilling - Simple Main Interface
 Clean interface for utility bill scraping
 """
 
+import os
+import sys
 import time
-import ollama
+import json
+import logging
+import shutil
+import atexit
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+from typing import Dict, List, Optional
+import requests
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from tabulate import tabulate
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 
 from utils import (
-    BillInfo, LoginHandler, SmartExtractionOrchestrator,
-    OLLAMA_MODEL, HEADLESS_BROWSER, SHOW_BROWSER, USER_AGENT, CHROME_OPTIONS, 
-    PAGE_LOAD_DELAY, DEBUG_MODE, VERBOSE_OUTPUT, BROWSER_WINDOW_SIZE,
-    human_like_delay, has_meaningful_billing_data
+    BillInfo, LoginHandler, SmartExtractionOrchestrator, llm_client,
+    OLLAMA_MODEL, OLLAMA_HOST, LLM_NUM_CTX, LLM_FAST_OPTIONS,
+    HEADLESS_BROWSER, SHOW_BROWSER, USER_AGENT, CHROME_OPTIONS, 
+    DEBUG_MODE, VERBOSE_OUTPUT, BROWSER_WINDOW_SIZE,
+    LOGIN_FORM_SELECTORS, LOGIN_FORM_WAIT, LOGIN_FIELD_SELECTORS, SIGNED_IN_SELECTORS, PAGE_LOAD_STRATEGY, CREDENTIALS_FILE,
+    BLOCK_IMAGES, CHROME_CONTENT_PREFS, BLOCK_STYLESHEETS, POST_LOGIN_WAIT, LOGIN_REDIRECT_WAIT,
+    CHROMEDRIVER_PATH_CACHE, PRETTY_TABLES, BLOCKED_URL_PATTERNS, CHROME_PROFILE_DIR,
+    BLOCK_FONTS, FONT_URL_PATTERNS,
+    has_meaningful_billing_data, get_relevant_html
 )
 from agents import NavigationAgent
 
+# Optional: kill Chrome processes left behind by a hung or crashed driver
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+class _StdoutHandler(logging.StreamHandler):
+    """StreamHandler that writes to sys.stdout as it is at emit time (it may be swapped or closed later)"""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+# Progress logger: lines go straight to stdout so they stay in order with the agents' print() output
+log = logging.getLogger("autobilling")
+log.setLevel(logging.DEBUG if DEBUG_MODE else logging.INFO)
+log.propagate = False
+if not log.handlers:
+    _console_handler = _StdoutHandler()
+    _console_handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(_console_handler)
+
+
+def _flush():
+    """Flush log output and stdout before another component writes to the console"""
+    for handler in log.handlers:
+        handler.flush()
+    sys.stdout.flush()
+
+
+# Chrome session shared by every scrape in this process (quit at exit)
+_SHARED_DRIVER = None
+
+
+def _driver_alive(driver) -> bool:
+    """Check if a WebDriver session still responds"""
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+
+def _quit_driver(driver):
+    """Quit a Chrome session and kill any browser processes it leaves behind"""
+    service_process = getattr(getattr(driver, 'service', None), 'process', None)
+    pid = getattr(service_process, 'pid', None)
+    
+    # Collect the process tree before quitting - children get re-parented once chromedriver exits
+    children = []
+    if pid and PSUTIL_AVAILABLE:
+        try:
+            children = psutil.Process(pid).children(recursive=True)
+        except psutil.Error:
+            pass
+    
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    
+    for child in children:
+        try:
+            child.kill()
+        except psutil.Error:
+            pass  # Already exited with the driver
+
+
+def _quit_shared_driver():
+    """Quit the shared Chrome session"""
+    global _SHARED_DRIVER
+    if _SHARED_DRIVER:
+        _quit_driver(_SHARED_DRIVER)
+        _SHARED_DRIVER = None
+
+
+atexit.register(_quit_shared_driver)
+atexit.register(llm_client.release)
+
+
+# Chrome arguments and experimental options shared by every browser launch (built once)
+_BASE_CHROME_ARGS = (f"--user-agent={USER_AGENT}",) + tuple(CHROME_OPTIONS)
+_BLOCKED_URLS = BLOCKED_URL_PATTERNS + (FONT_URL_PATTERNS if BLOCK_FONTS else [])
+_BASE_EXPERIMENTAL = {
+    "excludeSwitches": ["enable-automation"],
+    "useAutomationExtension": False,
+}
+
+
+def _apply_experimental_options(options: Options, experimental: Dict):
+    """Add each experimental option to a Chrome Options object"""
+    for name, value in experimental.items():
+        options.add_experimental_option(name, value)
+
+
+@lru_cache(maxsize=None)
+def get_chromedriver_path() -> str:
+    """Return the ChromeDriver path, only asking webdriver-manager when no cached binary exists"""
+    cache_file = Path(CHROMEDRIVER_PATH_CACHE).expanduser()
+    try:
+        cached_path = cache_file.read_text().strip()
+        if cached_path and os.access(cached_path, os.X_OK):
+            log.debug("   • Using cached ChromeDriver path")
+            return cached_path
+    except OSError:
+        pass
+    
+    # Cache miss: resolve (and download if needed) through webdriver-manager
+    os.environ.setdefault("WDM_LOG_LEVEL", "0")
+    from webdriver_manager.chrome import ChromeDriverManager
+    driver_path = ChromeDriverManager().install()
+    
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        cache_file.write_text(driver_path)
+    except OSError as e:
+        log.debug(f"   • Could not cache ChromeDriver path: {e}")
+    return driver_path
+
+
+def _forget_chromedriver_path():
+    """Drop the cached ChromeDriver path so the next run re-resolves it"""
+    get_chromedriver_path.cache_clear()
+    try:
+        Path(CHROMEDRIVER_PATH_CACHE).expanduser().unlink()
+    except OSError:
+        pass
+
 
 class UtilityBillScraper:
     """Simple AI-powered utility bill scraper"""
 
     def __init__(self):
         self.driver = None
-        if DEBUG_MODE:
-            print("🔍 Verifying Ollama connection...")
-            import sys
-            sys.stdout.flush()
-        self._verify_ollama_connection()
+        self.model_load_time = None
+        
+        # Launch the browser while Ollama loads the model - the two are independent
+        self._startup_pool = ThreadPoolExecutor(max_workers=1)
+        self._browser_future = self._startup_pool.submit(self._get_or_create_driver)
+        
+        log.debug("🔍 Verifying Ollama connection...")
+        try:
+            self._verify_ollama_connection()
+        except Exception:
+            # Don't leave the browser launching and the startup pool running behind a failed constructor
+            self.close(quit_browser=True)
+            raise
+        _flush()
 
     def _verify_ollama_connection(self):
         """Verify Ollama is available"""
         try:
-            if DEBUG_MODE:
-                print(f"   • Testing connection to {OLLAMA_MODEL}...")
-                import sys
-                sys.stdout.flush()
+            log.debug(f"   • Testing connection to {OLLAMA_MODEL}...")
             
             # Faster test with shorter timeout
-            import time
             start_time = time.time()
             
-            ollama.chat(
-                model=OLLAMA_MODEL,
-                messages=[{"role": "user", "content": "hi"}],
-                options={
-                    "num_predict": 1,
-                    "temperature": 0,
-                    "top_p": 1,
-                    "timeout": 10  # 10 second timeout
-                }
-            )
+            # Cheap check first: daemon is up and the model is pulled (no model load)
+            if self._ollama_model_listed():
+                end_time = time.time()
+                log.info(f"✅ Connected to Ollama with model: {OLLAMA_MODEL} ({end_time - start_time:.1f}s)")
             
-            end_time = time.time()
-            print(f"✅ Connected to Ollama with model: {OLLAMA_MODEL} ({end_time - start_time:.1f}s)")
+            # Load the weights now and keep them resident for the whole scrape run
+            load_start = time.time()
+            llm_client.preload(OLLAMA_MODEL, options={"num_ctx": LLM_NUM_CTX})
+            self.model_load_time = time.time() - load_start
+            log.info(f"🔥 Model preloaded: {OLLAMA_MODEL} ({self.model_load_time:.1f}s, pinned for this run)")
             
-            if DEBUG_MODE:
-                print("   • Ollama connection successful")
+            self._preload_fast_model()
+            
+            log.debug("   • Ollama connection successful")
         except Exception as e:
-            print(f"❌ Ollama connection failed: {e}")
-            if DEBUG_MODE:
-                import traceback
-                print("🐛 Ollama connection traceback:")
-                traceback.print_exc()
+            log.error(f"❌ Ollama connection failed: {e}")
+            log.debug("🐛 Ollama connection traceback:", exc_info=True)
             raise ValueError(f"Cannot connect to Ollama: {e}\nPlease ensure Ollama is running and {OLLAMA_MODEL} is available")
 
+    def _preload_fast_model(self):
+        """Warm the quantized model used for short navigation prompts, or fall back to OLLAMA_MODEL"""
+        if llm_client.fast_model == OLLAMA_MODEL:
+            return
+        try:
+            load_start = time.time()
+            llm_client.preload(llm_client.fast_model, options={"num_ctx": LLM_NUM_CTX})
+            log.info(f"🔥 Fast model preloaded: {llm_client.fast_model} ({time.time() - load_start:.1f}s)")
+        except Exception as e:
+            log.warning(f"⚠️ Fast model {llm_client.fast_model} unavailable ({e}) - using {OLLAMA_MODEL} for all prompts")
+            llm_client.fast_model = OLLAMA_MODEL
+
+    def _ollama_model_listed(self) -> bool:
+        """Check the Ollama tags endpoint for OLLAMA_MODEL without running the model"""
+        try:
+            response = requests.get(f"{OLLAMA_HOST}/api/tags", timeout=2)
+            response.raise_for_status()
+            names = {model.get('name', '') for model in response.json().get('models', [])}
+        except (requests.RequestException, ValueError) as e:
+            log.debug(f"   • Tag check failed ({e}), relying on model preload")
+            return False
+        
+        wanted = OLLAMA_MODEL if ':' in OLLAMA_MODEL else f"{OLLAMA_MODEL}:latest"
+        if wanted in names:
+            return True
+        log.debug(f"   • {OLLAMA_MODEL} not listed by Ollama, relying on model preload")
+        return False
+
     def scrape_utility_bill(self, url: str, username: str, password: str) -> BillInfo:
         """Main scraping method - coordinates all components"""
         try:
-            # Setup browser
-            self._setup_browser()
+            # Setup browser (reuses the shared session when still alive)
+            self._ensure_browser()
 
             # Navigate to login page
-            print(f"🌐 Navigating to {url}")
-            if DEBUG_MODE:
-                print(f"   • Loading page...")
+            log.info(f"🌐 Navigating to {url}")
+            log.debug(f"   • Loading page...")
             self.driver.get(url)
-            if DEBUG_MODE:
-                print(f"   • Page loaded, current URL: {self.driver.current_url}")
-                print(f"   • Page title: {self.driver.title}")
+            log.debug(f"   • Page loaded, current URL: {self.driver.current_url}")
+            log.debug(f"   • Page title: {self.driver.title}")
             
-            # Wait for page to load and JavaScript to render
-            human_like_delay(*PAGE_LOAD_DELAY)
+            # Wait for the DOM instead of a fixed delay (login form rendering is waited on below)
+            self._wait_for_dom_ready()
             
-            # Additional wait for JavaScript-rendered forms
-            if DEBUG_MODE:
-                print("   • Waiting for JavaScript content to render...")
-            time.sleep(3)  # Wait for dynamic content
+            # Saved profile cookies may already be signed in
+            if self._already_signed_in(url):
+                log.info("🍪 Already signed in from saved browser profile - skipping login")
+                _flush()
+                return self._explore_and_extract()
             
-            # Check if page is still loading
+            # Wait for JavaScript-rendered login forms instead of a fixed sleep
+            log.debug("   • Waiting for JavaScript content to render...")
             try:
-                from selenium.webdriver.support.ui import WebDriverWait
-                from selenium.webdriver.support import expected_conditions as EC
-                from selenium.webdriver.common.by import By
-                
-                # Wait for page to be ready
-                WebDriverWait(self.driver, 10).until(
-                    lambda driver: driver.execute_script("return document.readyState") == "complete"
+                WebDriverWait(self.driver, LOGIN_FORM_WAIT).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, LOGIN_FORM_SELECTORS))
                 )
-                
-                if DEBUG_MODE:
-                    print("   • Page ready state: complete")
-                    
-            except Exception as e:
-                if DEBUG_MODE:
-                    print(f"   • Page ready wait failed: {e}")
+                log.debug("   • Login form elements present")
+            except Exception:
+                log.debug(f"   • No login form elements after {LOGIN_FORM_WAIT}s, continuing...")
             
-            # Final page source after all content loads
-            if DEBUG_MODE:
-                final_content_length = len(self.driver.page_source)
-                print(f"   • Final page content length: {final_content_length} characters")
+            # Final page body after all content loads (read once, shared with login)
+            html_content = get_relevant_html(self.driver)
+            log.debug(f"   • Final page content length: {len(html_content)} characters")
 
             # Handle login
-            if not self._handle_login(username, password):
+            if not self._handle_login(username, password, html_content):
                 return BillInfo("Login failed", 0.0, "Could not authenticate", 0.0)
 
             # Post-login exploration and extraction
             return self._explore_and_extract()
 
         except Exception as e:
-            print(f"❌ Scraping error: {e}")
+            log.error(f"❌ Scraping error: {e}")
             return BillInfo("Error occurred", 0.0, str(e), 0.0)
-        finally:
-            self._cleanup()
+
+    def _already_signed_in(self, url: str) -> bool:
+        """Saved profile cookies are still valid: redirected off the login page to one with a sign-out link"""
+        login_page, current_page = urlparse(url), urlparse(self.driver.current_url)
+        if (current_page.netloc, current_page.path, current_page.fragment) == (login_page.netloc, login_page.path, login_page.fragment):
+            return False
+        
+        # SSO and SPA login routes render their fields late - wait until the page shows either state
+        try:
+            WebDriverWait(self.driver, LOGIN_FORM_WAIT).until(
+                lambda driver: driver.find_elements(By.CSS_SELECTOR, LOGIN_FIELD_SELECTORS)
+                or driver.find_elements(By.CSS_SELECTOR, SIGNED_IN_SELECTORS)
+            )
+        except TimeoutException:
+            log.debug(f"   • No login fields or sign-out link after {LOGIN_FORM_WAIT}s, trying login")
+            return False
+        return not self.driver.find_elements(By.CSS_SELECTOR, LOGIN_FIELD_SELECTORS)
+
+    def _wait_for_dom_ready(self, timeout: int = 5):
+        """Wait for the DOM to be ready (eager page loads return before subresources finish)"""
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                lambda driver: driver.execute_script("return document.readyState") in ("interactive", "complete")
+            )
+            
+            log.debug(f"   • Page ready state: {self.driver.execute_script('return document.readyState')}")
+                
+        except Exception as e:
+            log.debug(f"   • Page ready wait failed: {e}")
+
+    def _ensure_browser(self):
+        """Finish the browser launch started in __init__, or reuse/create one"""
+        if self._browser_future is not None:
+            future, self._browser_future = self._browser_future, None
+            return future.result()
+        return self._get_or_create_driver()
+
+    def _get_or_create_driver(self):
+        """Reuse the shared Chrome session or start a new one"""
+        global _SHARED_DRIVER
+        if _SHARED_DRIVER is not None and _driver_alive(_SHARED_DRIVER):
+            log.info("♻️ Reusing existing browser session")
+            self.driver = _SHARED_DRIVER
+            return self.driver
+
+        self._setup_browser()
+        _SHARED_DRIVER = self.driver
+        return self.driver
 
     def _setup_browser(self):
         """Setup Chrome browser with anti-detection measures"""
         # Determine if browser should be headless
         run_headless = HEADLESS_BROWSER or not SHOW_BROWSER
         
-        if DEBUG_MODE:
-            print(f"🔧 Setting up browser...")
-            print(f"   • Headless mode: {run_headless}")
-            print(f"   • Window size: {BROWSER_WINDOW_SIZE}")
-            print(f"   • Debug mode: {DEBUG_MODE}")
-            import sys
-            sys.stdout.flush()
-        else:
-            print("🔧 Setting up browser...")
+        log.info("🔧 Setting up browser...")
+        log.debug(f"   • Headless mode: {run_headless}")
+        log.debug(f"   • Window size: {BROWSER_WINDOW_SIZE}")
+        log.debug(f"   • Debug mode: {DEBUG_MODE}")
 
         chrome_options = Options()
+        
+        # Return from driver.get() at DOMContentLoaded instead of waiting for every subresource
+        chrome_options.page_load_strategy = PAGE_LOAD_STRATEGY
 
         if run_headless:
             chrome_options.add_argument("--headless")
             if VERBOSE_OUTPUT:
-                print("   • Running in headless mode (browser hidden)")
+                log.info("   • Running in headless mode (browser hidden)")
         else:
             if VERBOSE_OUTPUT:
-                print("   • Running in windowed mode (browser visible)")
-
-        chrome_options.add_argument(f"--user-agent={USER_AGENT}")
+                log.info("   • Running in windowed mode (browser visible)")
 
-        # Add all anti-detection options
-        for option in CHROME_OPTIONS:
+        # Add user agent and all anti-detection options
+        for option in _BASE_CHROME_ARGS:
             chrome_options.add_argument(option)
 
+        # Persistent profile so site cookies (and logged-in sessions) survive between runs
+        if CHROME_PROFILE_DIR:
+            profile_dir = Path(CHROME_PROFILE_DIR).expanduser()
+            profile_dir.mkdir(parents=True, exist_ok=True)
+            chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+            log.debug(f"   • Browser profile: {profile_dir}")
+
         # Experimental options for anti-detection
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
+        _apply_experimental_options(chrome_options, _BASE_EXPERIMENTAL)
 
-        if DEBUG_MODE:
-            print(f"   • Chrome options: {len(CHROME_OPTIONS)} anti-detection measures")
-            print("   • Setting up ChromeDriver...")
-            import sys
-            sys.stdout.flush()
+        # Don't download images (or optionally CSS) - only the DOM and text matter for scraping
+        if BLOCK_IMAGES:
+            prefs = dict(CHROME_CONTENT_PREFS)
+            if BLOCK_STYLESHEETS and run_headless:
+                prefs["profile.managed_default_content_settings.stylesheets"] = 2
+            chrome_options.add_experimental_option("prefs", prefs)
+            chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+
+        log.debug(f"   • Chrome options: {len(CHROME_OPTIONS)} anti-detection measures")
+        log.debug("   • Setting up ChromeDriver...")
 
         # ChromeDriver setup with debugging
         try:
-            if DEBUG_MODE:
-                print("   • Installing/updating ChromeDriver...")
-                sys.stdout.flush()
-            
-            # Use ChromeDriverManager with simplified setup
-            from webdriver_manager.chrome import ChromeDriverManager
+            log.debug("   • Installing/updating ChromeDriver...")
             
-            # Get ChromeDriver path
-            driver_path = ChromeDriverManager().install()
+            # Get ChromeDriver path (cached after the first webdriver-manager install)
+            driver_path = get_chromedriver_path()
             
-            if DEBUG_MODE:
-                print(f"   • ChromeDriver path: {driver_path}")
-                print("   • Creating browser instance...")
-                sys.stdout.flush()
+            log.debug(f"   • ChromeDriver path: {driver_path}")
+            log.debug("   • Creating browser instance...")
             
             # Create service
             service = Service(driver_path)
             
             self.driver = webdriver.Chrome(service=service, options=chrome_options)
             
-            if DEBUG_MODE:
-                print("   • Chrome browser created successfully")
-                sys.stdout.flush()
+            log.debug("   • Chrome browser created successfully")
                 
         except Exception as browser_error:
-            print(f"❌ Browser setup failed: {browser_error}")
-            if DEBUG_MODE:
-                import traceback
-                print("🐛 Browser setup traceback:")
-                traceback.print_exc()
+            log.error(f"❌ Browser setup failed: {browser_error}")
+            _forget_chromedriver_path()  # Cached driver may be stale (e.g. Chrome was updated)
+            log.debug("🐛 Browser setup traceback:", exc_info=True)
                 
             # Try alternative ChromeDriver setup without webdriver-manager
-            print("🔄 Trying system ChromeDriver (no webdriver-manager)...")
+            log.info("🔄 Trying system ChromeDriver (no webdriver-manager)...")
             try:
                 # Simplified options for problematic systems
                 simple_options = Options()
+                simple_options.page_load_strategy = PAGE_LOAD_STRATEGY
                 if run_headless:
                     simple_options.add_argument("--headless")
                 simple_options.add_argument("--no-sandbox")
                 simple_options.add_argument("--disable-dev-shm-usage")
                 simple_options.add_argument("--disable-gpu")
+                if BLOCK_IMAGES:
+                    simple_options.add_experimental_option("prefs", CHROME_CONTENT_PREFS)
+                    simple_options.add_argument("--blink-settings=imagesEnabled=false")
+                
+                # Pick the first chromedriver binary on disk, then launch Chrome once
+                candidates = [
+                    shutil.which("chromedriver"),
+                    '/usr/local/bin/chromedriver',
+                    '/opt/homebrew/bin/chromedriver',
+                    '/usr/bin/chromedriver'
+                ]
+                driver_path = next(
+                    (path for path in candidates if path and os.path.exists(path) and os.access(path, os.X_OK)),
+                    None
+                )
+                
+                if not driver_path:
+                    # No ChromeDriver found anywhere
+                    log.error("❌ ChromeDriver not found. Please install ChromeDriver manually:\n"
+                              "  brew install chromedriver\n"
+                              "  or download from: https://chromedriver.chromium.org/")
+                    raise browser_error
+                
+                self.driver = webdriver.Chrome(service=Service(driver_path), options=simple_options)
+                log.info(f"✅ Using ChromeDriver at: {driver_path}")
                 
-                # Try without specifying ChromeDriver path (uses system PATH)
-                try:
-                    self.driver = webdriver.Chrome(options=simple_options)
-                    print("✅ Using system ChromeDriver from PATH")
-                except Exception as system_error:
-                    print(f"❌ System ChromeDriver failed: {system_error}")
-                    
-                    # Final attempt: Try common paths
-                    common_paths = [
-                        '/usr/local/bin/chromedriver',
-                        '/opt/homebrew/bin/chromedriver',
-                        '/usr/bin/chromedriver'
-                    ]
-                    
-                    for path in common_paths:
-                        try:
-                            import os
-                            if os.path.exists(path):
-                                service = Service(path)
-                                self.driver = webdriver.Chrome(service=service, options=simple_options)
-                                print(f"✅ Using ChromeDriver at: {path}")
-                                break
-                        except:
-                            continue
-                    else:
-                        # No ChromeDriver found anywhere
-                        print("❌ ChromeDriver not found. Please install ChromeDriver manually:")
-                        print("  brew install chromedriver")
-                        print("  or download from: https://chromedriver.chromium.org/")
-                        raise browser_error
-                    
             except Exception as fallback_error:
-                print(f"❌ All ChromeDriver methods failed: {fallback_error}")
+                log.error(f"❌ All ChromeDriver methods failed: {fallback_error}")
                 raise browser_error  # Raise original error
 
         # Remove webdriver property
         self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         
+        # Drop analytics/ad requests before they reach the network
+        self._block_tracking_requests()
+        
         if DEBUG_MODE:
-            print(f"   • Browser setup complete")
+            log.debug(f"   • Browser setup complete")
             try:
                 window_size = self.driver.get_window_size()
-                print(f"   • Window size: {window_size}")
-                print(f"   • Current URL: {self.driver.current_url}")
+                log.debug(f"   • Window size: {window_size}")
+                log.debug(f"   • Current URL: {self.driver.current_url}")
             except Exception as e:
-                print(f"   • Could not get browser details: {e}")
-            import sys
-            sys.stdout.flush()
+                log.debug(f"   • Could not get browser details: {e}")
+        _flush()
 
-    def _handle_login(self, username: str, password: str) -> bool:
+    def _block_tracking_requests(self):
+        """Install a CDP URL blocklist for trackers (and web fonts) and keep the HTTP cache on"""
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": _BLOCKED_URLS})
+            self.driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": False})
+            log.debug(f"   • Blocking {len(_BLOCKED_URLS)} tracker/font URL patterns")
+        except Exception as e:
+            log.debug(f"   • Could not install URL blocklist: {e}")
+
+    def _handle_login(self, username: str, password: str, html_content: Optional[str] = None) -> bool:
         """Handle login using LoginHandler component"""
-        if DEBUG_MODE:
-            print("🔐 Starting login process...")
-            print(f"   • Username: {username}")
-            print(f"   • Password: {'*' * len(password)}")
+        log.debug("🔐 Starting login process...")
+        log.debug(f"   • Username: {username}")
+        log.debug(f"   • Password: {'*' * len(password)}")
             
         login_handler = LoginHandler(self.driver)
-        html_content = self.driver.page_source
-        
-        if DEBUG_MODE:
-            print(f"   • Page source length: {len(html_content)} characters")
+        if html_content is None:
+            html_content = get_relevant_html(self.driver)
 
+        pre_login_url = self.driver.current_url
+        _flush()  # LoginHandler prints directly
         success = login_handler.find_and_fill_login(html_content, username, password)
 
         if success:
-            print("✅ Login successful!")
+            log.info("✅ Login successful!")
             # Wait for post-login navigation
-            print("⏳ Waiting for post-login navigation...")
-            if DEBUG_MODE:
-                print(f"   • Current URL before wait: {self.driver.current_url}")
-            time.sleep(8)  # Allow SPA to navigate
+            log.info("⏳ Waiting for post-login navigation...")
+            log.debug(f"   • Current URL before wait: {self.driver.current_url}")
+            try:
+                WebDriverWait(self.driver, POST_LOGIN_WAIT).until(EC.url_changes(pre_login_url))
+            except TimeoutException:
+                log.debug(f"   • URL unchanged after {POST_LOGIN_WAIT}s")
 
             # Check if still on login page
             current_url = self.driver.current_url
-            if DEBUG_MODE:
-                print(f"   • Current URL after wait: {current_url}")
+            log.debug(f"   • Current URL after wait: {current_url}")
                 
             if "login" in current_url.lower():
-                print("🔄 Still on login page, waiting longer...")
-                time.sleep(10)
-
-                # Force refresh if needed
-                if "login" in self.driver.current_url.lower():
-                    print("🔄 Refreshing page...")
+                log.info("🔄 Still on login page, waiting longer...")
+                try:
+                    WebDriverWait(self.driver, LOGIN_REDIRECT_WAIT).until_not(EC.url_contains("login"))
+                except TimeoutException:
+                    # Force refresh if needed
+                    log.info("🔄 Refreshing page...")
                     self.driver.refresh()
-                    time.sleep(5)
-                    if DEBUG_MODE:
-                        print(f"   • URL after refresh: {self.driver.current_url}")
+                    self._wait_for_dom_ready()
+                    log.debug(f"   • URL after refresh: {self.driver.current_url}")
         else:
-            if DEBUG_MODE:
-                print("❌ Login failed - could not find or fill login form")
+            log.debug("❌ Login failed - could not find or fill login form")
 
+        _flush()
         return success
 
     def _explore_and_extract(self) -> BillInfo:
         """Coordinate navigation and extraction"""
-        print("🧭 Starting intelligent exploration...")
+        log.info("🧭 Starting intelligent exploration...")
+        _flush()
 
         # Initialize components
         extraction_orchestrator = SmartExtractionOrchestrator()
         navigation_explorer = NavigationAgent(self.driver)
 
         # Use navigation explorer to find and extract billing data
-        return navigation_explorer.explore_for_billing_data(extraction_orchestrator)
+        try:
+            return navigation_explorer.explore_for_billing_data(extraction_orchestrator)
+        finally:
+            navigation_explorer.close()  # Don't leave an abandoned AI evaluation queued behind an early return
+
+    def close(self, quit_browser: bool = False):
+        """Release this scraper; the shared browser stays up for reuse unless quit_browser is set (atexit quits it)"""
+        global _SHARED_DRIVER
+        if self._browser_future is not None:
+            # Let a pending launch finish so its browser is quit below
+            try:
+                self._ensure_browser()
+            except Exception:
+                pass
+        self._startup_pool.shutdown(wait=False)
+        if self.driver is None:
+            return
+        if self.driver is not _SHARED_DRIVER or quit_browser:
+            _quit_driver(self.driver)
+            if self.driver is _SHARED_DRIVER:
+                _SHARED_DRIVER = None  # A later scraper must start a new session, not reuse this dead one
+        self.driver = None
+
+    def __enter__(self):
+        return self
 
-    def _cleanup(self):
-        """Clean up browser resources"""
-        if self.driver:
-            self.driver.quit()
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
 
 
-def display_billing_table(bill_info: BillInfo):
+def _fast_grid(rows: List[List[str]], headers: List[str]) -> str:
+    """Render rows as a tabulate-style grid using precomputed column widths"""
+    widths = [max(len(h), max((len(r[i]) for r in rows), default=0)) for i, h in enumerate(headers)]
+    sep = "+" + "+".join("-" * (w + 2) for w in widths) + "+"
+    fmt = "| " + " | ".join(f"{{:<{w}}}" for w in widths) + " |"
+    out = [sep, fmt.format(*headers), sep.replace("-", "=")]
+    out.extend(fmt.format(*r) for r in rows)
+    out.append(sep)
+    return "\n".join(out)
+
+
+def _format_grid(rows: List[List[str]], headers: List[str], pretty: bool = False) -> str:
+    """Grid table via the built-in formatter, or tabulate when pretty is set"""
+    if pretty:
+        from tabulate import tabulate  # Only imported when asked for
+        return tabulate(rows, headers=headers, tablefmt="grid")
+    return _fast_grid(rows, headers)
+
+
+def display_billing_table(bill_info: BillInfo, pretty: bool = PRETTY_TABLES):
     """Display billing information in a clean table format"""
-    print("\n" + "="*50)
-    print("💡 UTILITY BILLING HISTORY")
-    print("="*50)
+    # Build the whole report first and emit it with a single write
+    lines = ["", "="*50, "💡 UTILITY BILLING HISTORY", "="*50]
     
     # Check if comprehensive billing history is available
     if hasattr(bill_info, 'all_bills') and bill_info.all_bills and len(bill_info.all_bills) > 2:
-        print(f"📊 Found {len(bill_info.all_bills)} billing records (latest per month)")
-        print("="*50)
+        lines.append(f"📊 Found {len(bill_info.all_bills)} billing records (latest per month)")
+        lines.append("="*50)
         
         # Create comprehensive billing table (latest per month only)
-        data = []
-        for bill in bill_info.all_bills:
-            if isinstance(bill['date'], str):
-                date_str = bill['date']
-            else:
-                date_str = bill['date'].strftime('%m/%d/%Y')
-            data.append([date_str, f"${bill['amount']:.2f}"])
-
-        print(tabulate(data, headers=["Date", "Amount"], tablefmt="grid"))
+        date_format = '%m/%d/%Y'
+        data = [
+            [bill['date'] if isinstance(bill['date'], str) else bill['date'].strftime(date_format),
+             f"${bill['amount']:.2f}"]
+            for bill in bill_info.all_bills
+        ]
+        lines.append(_format_grid(data, ["Date", "Amount"], pretty))
 
     else:
         # Simple display for basic data
@@ -352,13 +610,24 @@ def display_billing_table(bill_info: BillInfo):
             [bill_info.current_month, f"${bill_info.current_amount:.2f}"],
             ["Difference", f"${bill_info.current_amount - bill_info.previous_amount:.2f}"]
         ]
+        lines.append(_format_grid(data, ["Date", "Amount"], pretty))
+
+    lines.append("="*50)
+    
+    sys.stdout.write("\n".join(lines) + "\n")
+    _flush()
 
-        print(tabulate(data, headers=["Date", "Amount"], tablefmt="grid"))
 
-    print("="*50)
+def _print_setup_help():
+    """Print how to get Ollama and the models ready"""
+    print("Please ensure Ollama is running:")
+    print("  ollama pull qwen2.5:latest")
+    print("  ollama pull qwen2.5vl:7b  # For Vision AI")
+    print("  uv add Pillow  # For Vision AI support")
 
 
-def scrape_utility_bills(url: str, username: str, password: str) -> BillInfo:
+def scrape_utility_bills(url: str, username: str, password: str,
+                         scraper: Optional[UtilityBillScraper] = None) -> BillInfo:
     """
     Simple function to scrape utility bills
     
@@ -366,41 +635,55 @@ def scrape_utility_bills(url: str, username: str, password: str) -> BillInfo:
         url: Utility website URL
         username: Login username/email
         password: Login password
+        scraper: Existing scraper to reuse (browser and model stay warm between calls)
         
     Returns:
         BillInfo object with billing data
     """
+    owns_scraper = scraper is None
     try:
-        if DEBUG_MODE:
-            print("🔧 Creating UtilityBillScraper instance...")
-            import sys
-            sys.stdout.flush()
-        
-        scraper = UtilityBillScraper()
-        
-        if DEBUG_MODE:
-            print("✅ Scraper created, starting bill scraping...")
-            sys.stdout.flush()
+        if owns_scraper:
+            log.debug("🔧 Creating UtilityBillScraper instance...")
+            
+            scraper = UtilityBillScraper()
+            
+            log.debug("✅ Scraper created, starting bill scraping...")
         
         return scraper.scrape_utility_bill(url, username, password)
     except ValueError as e:
-        print(f"❌ Configuration Error: {e}")
-        print("Please ensure Ollama is running:")
-        print("  ollama pull qwen2.5:latest")
-        print("  ollama pull qwen2.5vl:7b  # For Vision AI")
-        print("  uv add Pillow  # For Vision AI support")
+        log.error(f"❌ Configuration Error: {e}")
+        _print_setup_help()
         return BillInfo("Configuration error", 0.0, str(e), 0.0)
     except Exception as e:
-        print(f"❌ Unexpected Error: {e}")
-        if DEBUG_MODE:
-            import traceback
-            print("🐛 Full traceback:")
-            traceback.print_exc()
+        log.error(f"❌ Unexpected Error: {e}")
+        log.debug("🐛 Full traceback:", exc_info=True)
         return BillInfo("Unexpected error", 0.0, str(e), 0.0)
+    finally:
+        if owns_scraper and scraper is not None:
+            scraper.close()
+
+
+@lru_cache(maxsize=None)
+def load_credentials(path: str = CREDENTIALS_FILE) -> Dict[str, str]:
+    """Load site URL and login from a JSON file"""
+    try:
+        with open(path) as f:
+            credentials = json.load(f)
+    except FileNotFoundError:
+        raise ValueError(f"{path} not found - create it with \"url\", \"username\" and \"password\" keys") from None
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"Could not read {path}: {e}") from None
+    
+    missing = [key for key in ('url', 'username', 'password') if not credentials.get(key)]
+    if missing:
+        raise ValueError(f"{path} is missing {', '.join(missing)}")
+    
+    log.debug(f"🔑 Loaded credentials from {path}")
+    return credentials
 
 
-def main():
-    """Interactive main function"""
+def main(pretty: bool = PRETTY_TABLES):
+    """Interactive main function (pretty renders tables with tabulate)"""
     print("🏠 AutoBilling - Universal AI-Powered Utility Bill Scraper")
     print("🤖 Clean, fast, and modular design!")
     print("=" * 60)
@@ -417,15 +700,15 @@ def main():
     print("=" * 60)
 
     try:
-        # Get user input
-        url = 'https://flowermoundtx.municipalonlinepayments.com/flowermoundtx/login'
-        # url ='https://coserv.smarthub.coop/ui/#/login'
-        username = 'vygemnguyen@gmail.com'
-        password = 'Dancingapple42!'
-
-        if not all([url, username, password]):
-            print("❌ All fields are required!")
-            return
+        credentials = load_credentials()
+    except ValueError as e:
+        print(f"❌ Credentials Error: {e}")
+        return
+
+    try:
+        url = credentials['url']
+        username = credentials['username']
+        password = credentials['password']
 
         print("\n🧠 Starting optimized AI analysis...")
         print("✨ The system will automatically:")
@@ -437,15 +720,18 @@ def main():
         print()  # Add blank line before starting
         
         # Flush output to ensure everything appears immediately
-        import sys
-        sys.stdout.flush()
+        _flush()
 
-        # Run scraper
-        bill_info = scrape_utility_bills(url, username, password)
+        # Run scraper (the browser session is kept for reuse and quit at exit)
+        with UtilityBillScraper() as scraper:
+            bill_info = scrape_utility_bills(url, username, password, scraper=scraper)
 
         # Display results
-        display_billing_table(bill_info)
+        display_billing_table(bill_info, pretty)
 
+    except ValueError as e:
+        print(f"❌ Configuration Error: {e}")
+        _print_setup_help()
     except KeyboardInterrupt:
         print("\n⏹️ Interrupted by user")
     except Exception as e:
@@ -459,12 +745,12 @@ def test_components():
     # Test 1: Ollama
     print("\n1️⃣ Testing Ollama connection...")
     try:
-        import time
         start = time.time()
-        ollama.chat(
+        # Shared pooled client, bypassing the response cache so this really reaches Ollama
+        llm_client.ollama.chat(
             model=OLLAMA_MODEL,
             messages=[{"role": "user", "content": "test"}],
-            options={"num_predict": 1, "timeout": 5}
+            options=LLM_FAST_OPTIONS
         )
         print(f"   ✅ Ollama works ({time.time() - start:.1f}s)")
     except Exception as e:
@@ -474,9 +760,8 @@ def test_components():
     # Test 2: ChromeDriver
     print("\n2️⃣ Testing ChromeDriver setup...")
     try:
-        from webdriver_manager.chrome import ChromeDriverManager
         start = time.time()
-        driver_path = ChromeDriverManager().install()
+        driver_path = get_chromedriver_path()
         print(f"   ✅ ChromeDriver ready ({time.time() - start:.1f}s)")
         print(f"   📍 Driver path: {driver_path}")
     except Exception as e:
@@ -510,9 +795,24 @@ def test_components():
     print("\n🎉 All components working! The issue might be in the actual scraping logic.")
 
 
+# CLI sub-commands (default: interactive scrape)
+COMMANDS = {
+    "test": test_components,
+}
+
+
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) > 1 and sys.argv[1] == "test":
-        test_components()
+    args = sys.argv[1:]
+    if "--no-cache" in args:
+        # Always ask the model, but keep recording responses for later runs
+        args.remove("--no-cache")
+        llm_client.read_disk_cache = False
+    pretty = "--pretty" in args
+    if pretty:
+        # Render tables with tabulate instead of the built-in grid formatter
+        args.remove("--pretty")
+    command = args[0] if args else ""
+    if command in COMMANDS:
+        COMMANDS[command]()
     else:
-        main() 
\ No newline at end of file
+        main(pretty=pretty or PRETTY_TABLES)
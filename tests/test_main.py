@@ -0,0 +1,149 @@
+"""Tests for UtilityBillScraper lifecycle (no browser or Ollama needed)"""
+
+import pytest
+
+import main
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_log_lines_go_to_the_current_stdout_immediately(capsys):
+    main.log.info("🌐 Navigating to https://example.com/login")
+
+    assert capsys.readouterr().out == "🌐 Navigating to https://example.com/login\n"
+
+
+def test_failed_ollama_check_quits_the_launching_browser(monkeypatch):
+    driver = FakeDriver()
+
+    def fake_launch(scraper):
+        scraper.driver = driver
+        return driver
+
+    def fail_ollama_check(scraper):
+        raise ValueError("Cannot connect to Ollama")
+
+    monkeypatch.setattr(main.UtilityBillScraper, "_get_or_create_driver", fake_launch)
+    monkeypatch.setattr(main.UtilityBillScraper, "_verify_ollama_connection", fail_ollama_check)
+
+    with pytest.raises(ValueError):
+        main.UtilityBillScraper()
+    assert driver.quit_called
+
+
+def make_scraper(driver):
+    scraper = main.UtilityBillScraper.__new__(main.UtilityBillScraper)
+    scraper.driver = driver
+    scraper._browser_future = None
+    scraper._startup_pool = main.ThreadPoolExecutor(max_workers=1)
+    return scraper
+
+
+def test_close_keeps_the_shared_driver_for_reuse(monkeypatch):
+    driver = FakeDriver()
+    monkeypatch.setattr(main, "_SHARED_DRIVER", driver)
+
+    make_scraper(driver).close()
+
+    assert not driver.quit_called
+    assert main._SHARED_DRIVER is driver
+
+
+def test_close_with_quit_browser_forgets_the_shared_driver(monkeypatch):
+    driver = FakeDriver()
+    monkeypatch.setattr(main, "_SHARED_DRIVER", driver)
+
+    make_scraper(driver).close(quit_browser=True)
+
+    assert driver.quit_called
+    assert main._SHARED_DRIVER is None
+
+
+def test_scrape_utility_bills_closes_the_scraper_it_creates(monkeypatch):
+    closed = []
+    monkeypatch.setattr(main.UtilityBillScraper, "__init__", lambda scraper: None)
+    monkeypatch.setattr(main.UtilityBillScraper, "scrape_utility_bill", lambda scraper, url, username, password: "bill")
+    monkeypatch.setattr(main.UtilityBillScraper, "close", lambda scraper: closed.append(scraper))
+
+    assert main.scrape_utility_bills("https://example.com/login", "user", "pass") == "bill"
+    assert len(closed) == 1
+
+
+class PageDriver:
+    """Reports a URL; login fields and a sign-out link show up after a number of polls"""
+
+    def __init__(self, current_url, login_fields_after=None, sign_out_after=None):
+        self.current_url = current_url
+        self.shown_after = {
+            main.LOGIN_FIELD_SELECTORS: login_fields_after,
+            main.SIGNED_IN_SELECTORS: sign_out_after,
+        }
+        self.polls = 0
+
+    def find_elements(self, by, value):
+        if value == main.LOGIN_FIELD_SELECTORS:
+            self.polls += 1
+        shown_after = self.shown_after[value]
+        return [object()] if shown_after is not None and self.polls > shown_after else []
+
+
+@pytest.mark.parametrize("current_url, login_fields_after, sign_out_after, signed_in", [
+    ("https://example.com/account/overview", None, 0, True),  # Redirected to the account page
+    ("https://example.com/account/overview", None, 1, True),  # Account page renders after a moment
+    ("https://example.com/signin?next=/billing", 0, None, False),  # Redirected to a signin page
+    ("https://sso.example.com/auth/realms/portal", 1, None, False),  # SSO form still rendering
+    ("https://sso.example.com/auth/realms/portal", None, None, False),  # Nothing rendered in time
+    ("https://example.com/login?lang=en", None, 0, False),  # Still on the login page
+])
+def test_already_signed_in_needs_a_sign_out_link_off_the_login_page(
+        monkeypatch, current_url, login_fields_after, sign_out_after, signed_in):
+    monkeypatch.setattr(main, "LOGIN_FORM_WAIT", 2)
+    scraper = main.UtilityBillScraper.__new__(main.UtilityBillScraper)
+    scraper.driver = PageDriver(current_url, login_fields_after, sign_out_after)
+
+    assert scraper._already_signed_in("https://example.com/login") is signed_in
+
+
+def test_load_credentials_reads_the_file(tmp_path):
+    path = tmp_path / "credentials.json"
+    path.write_text('{"url": "https://example.com/login", "username": "user", "password": "pass"}')
+
+    assert main.load_credentials(str(path)) == {"url": "https://example.com/login", "username": "user", "password": "pass"}
+
+
+@pytest.mark.parametrize("contents, message", [
+    (None, "not found"),
+    ('{"url": "https://example.com/login", "username": "user"}', "missing password"),
+    ("{not json", "Could not read"),
+])
+def test_load_credentials_fails_without_a_complete_file(tmp_path, contents, message):
+    path = tmp_path / "credentials.json"
+    if contents is not None:
+        path.write_text(contents)
+
+    with pytest.raises(ValueError, match=message):
+        main.load_credentials(str(path))
+
+
+class MarkupString(str):
+    """A str subclass, like the strings some parsers hand back"""
+
+
+def test_billing_table_accepts_str_subclass_dates(capsys):
+    from datetime import datetime
+
+    bills = [
+        {'date': MarkupString("03/15/2024"), 'amount': 52.30},
+        {'date': datetime(2024, 2, 15), 'amount': 48.75},
+        {'date': "01/15/2024", 'amount': 45.10},
+    ]
+    main.display_billing_table(main.BillInfo("Feb 2024", 48.75, "Mar 2024", 52.30, all_bills=bills))
+
+    out = capsys.readouterr().out
+    assert "03/15/2024" in out and "02/15/2024" in out and "01/15/2024" in out
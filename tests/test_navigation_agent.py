@@ -0,0 +1,155 @@
+"""Tests for NavigationAgent page exploration (no browser or Ollama needed)"""
+
+from selenium.common.exceptions import NoSuchElementException
+
+import agents.navigation_agent as navigation_agent
+from agents import NavigationAgent
+from utils import BillInfo
+
+DASHBOARD = "<html><body><main><h1>Dashboard</h1><p>Welcome back</p></main></body></html>"
+BILLING = "<html><body><main><h1>Billing history</h1><table><tr><td>01/15/2024</td><td>$45.10</td></tr></table></main></body></html>"
+
+
+class FakeDriver:
+    """Serves canned HTML per URL; a list of HTML strings is shown one page_source read at a time"""
+
+    def __init__(self, pages, start_url="https://example.com/dashboard"):
+        self.pages = pages
+        self.current_url = start_url
+        self._views = list(self._as_views(pages[start_url]))
+
+    @staticmethod
+    def _as_views(html):
+        return html if isinstance(html, list) else [html]
+
+    def get(self, url):
+        self.current_url = url
+        self._views = list(self._as_views(self.pages[url]))
+
+    @property
+    def page_source(self):
+        return self._views.pop(0) if len(self._views) > 1 else self._views[0]
+
+    def find_element(self, by, value):
+        raise NoSuchElementException()  # No loading spinners
+
+    def find_elements(self, by, value):
+        return [object(), object(), object()]  # Enough SPA content elements
+
+    def execute_cdp_cmd(self, cmd, params):
+        return {"result": {"value": self._views[0]}}
+
+
+class FakeOrchestrator:
+    """Counts extractions and returns a bill for every page"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def extract_billing_data(self, page_source, driver, is_billing_page):
+        self.calls += 1
+        return BillInfo("Jan 2024", 45.10, "Dec 2023", 40.00)
+
+
+def make_agent(monkeypatch, pages):
+    monkeypatch.setattr(navigation_agent, "SPA_RERENDER_WAIT", 0.5)
+    agent = NavigationAgent(FakeDriver(pages))
+    monkeypatch.setattr(agent.billing_evaluator, "evaluate_page_sufficiency", lambda page_source: {
+        'has_sufficient_billing_data': True, 'months_of_data_found': 4, 'data_quality': 'good'
+    })
+    # The dashboard is the page exploration starts from
+    agent._visited_fingerprints.add(agent._page_fingerprint(DASHBOARD))
+    return agent
+
+
+def test_repeat_page_under_another_url_is_skipped(monkeypatch):
+    pages = {
+        "https://example.com/dashboard": DASHBOARD,
+        "https://example.com/billing": BILLING,
+        "https://example.com/billing?session=abc": BILLING,
+    }
+    agent = make_agent(monkeypatch, pages)
+    orchestrator = FakeOrchestrator()
+
+    first = agent._explore_single_link("https://example.com/billing", {}, orchestrator)
+    repeat = agent._explore_single_link("https://example.com/billing?session=abc", {}, orchestrator)
+
+    assert first is not None
+    assert repeat is None
+    assert orchestrator.calls == 1
+
+
+def test_redirect_back_to_dashboard_is_skipped(monkeypatch):
+    pages = {"https://example.com/dashboard": DASHBOARD, "https://example.com/account": DASHBOARD}
+    agent = make_agent(monkeypatch, pages)
+    orchestrator = FakeOrchestrator()
+
+    assert agent._explore_single_link("https://example.com/account", {}, orchestrator) is None
+    assert orchestrator.calls == 0
+
+
+def test_slow_spa_render_is_not_mistaken_for_a_repeat(monkeypatch):
+    # The route still shows the dashboard for the first two reads, then renders the billing view
+    pages = {"https://example.com/dashboard": DASHBOARD, "https://example.com/#/billing": [DASHBOARD, DASHBOARD, BILLING]}
+    agent = make_agent(monkeypatch, pages)
+    orchestrator = FakeOrchestrator()
+
+    assert agent._explore_single_link("https://example.com/#/billing", {}, orchestrator) is not None
+    assert orchestrator.calls == 1
+
+
+def test_close_drops_queued_evaluations(monkeypatch):
+    import threading
+
+    agent = make_agent(monkeypatch, {"https://example.com/dashboard": DASHBOARD})
+    release = threading.Event()
+    monkeypatch.setattr(agent.billing_evaluator, "evaluate_page_sufficiency", lambda page_source: release.wait(5))
+
+    running = agent._start_evaluation(DASHBOARD)
+    queued = agent._start_evaluation(BILLING)
+    agent.close()
+    release.set()
+
+    assert queued.cancelled()
+    assert running.result(timeout=5) is True
+
+
+class MenuDriver(FakeDriver):
+    """Renders a menu a few page reads after the click, or never"""
+
+    def __init__(self, renders_after):
+        super().__init__({"https://example.com/dashboard": DASHBOARD})
+        self.renders_after = renders_after
+        self.clicked = False
+        self.reads_since_click = 0
+
+    def execute_script(self, script, *args):
+        if script == navigation_agent.DOM_SNAPSHOT_JS:
+            if self.clicked:
+                self.reads_since_click += 1
+            rendered = self.renders_after is not None and self.reads_since_click > self.renders_after
+            return [12 if rendered else 3, 4000 if rendered else 1500]
+        self.clicked = True
+
+
+class FakeElement:
+    def is_enabled(self):
+        return True
+
+
+def test_click_waits_for_the_menu_to_render(monkeypatch):
+    agent = make_agent(monkeypatch, {"https://example.com/dashboard": DASHBOARD})
+    agent.driver = MenuDriver(renders_after=2)
+
+    agent._click_and_wait_for_change(FakeElement())
+
+    assert agent.driver.reads_since_click == 3
+
+
+def test_click_wait_is_bounded_when_nothing_changes(monkeypatch):
+    agent = make_agent(monkeypatch, {"https://example.com/dashboard": DASHBOARD})
+    agent.driver = MenuDriver(renders_after=None)
+
+    agent._click_and_wait_for_change(FakeElement(), timeout=0.5)
+
+    assert agent.driver.clicked
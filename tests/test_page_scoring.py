@@ -0,0 +1,40 @@
+"""Billing page quality scores on representative pages (85+ ends exploration)"""
+
+import pytest
+
+from agents import NavigationAgent
+
+BILLING_HISTORY = """<html><body><h1>Billing history</h1><table>
+<tr><th>Date</th><th>Amount</th></tr>
+<tr><td>01/15/2024</td><td>$45.10</td></tr>
+<tr><td>02/15/2024</td><td>$52.30</td></tr>
+<tr><td>03/15/2024</td><td>$48.75</td></tr>
+<tr><td>04/15/2024</td><td>$61.20</td></tr>
+</table><p>Current balance $61.20. Amount due $61.20 by May 1, 2024.</p></body></html>"""
+
+DASHBOARD = """<html><body><main><h2>Account overview</h2><p>Current bill amount: $87.40</p>
+<p>Amount due: $87.40</p><p>Payment received: $75.00 paid on March 3, 2024</p></main></body></html>"""
+
+# "15 January 2024" is matched by both the "DD Month YYYY" and "Month YYYY" date patterns,
+# and each match counts as its own date-amount pair
+DAY_MONTH_TABLE = """<html><body><table>
+<tr><td>15 January 2024</td><td>$45.10</td></tr>
+<tr><td>15 February 2024</td><td>$52.30</td></tr>
+</table></body></html>"""
+
+CONTACT_PAGE = "<html><body><h1>Contact us</h1><p>Call 555-1234</p></body></html>"
+
+
+@pytest.fixture
+def agent():
+    return NavigationAgent(driver=None)
+
+
+@pytest.mark.parametrize("page_source, expected_score", [
+    (BILLING_HISTORY, 100),
+    (DASHBOARD, 100),
+    (DAY_MONTH_TABLE, 80),
+    (CONTACT_PAGE, 0),
+])
+def test_page_scores(agent, page_source, expected_score):
+    assert agent._compute_page_score(page_source) == expected_score
@@ -0,0 +1,12 @@
+"""Tests for PromptLibrary message splitting"""
+
+from utils.prompts import PromptLibrary
+
+
+def test_link_ranking_keeps_links_out_of_the_system_message():
+    first = PromptLibrary.get_messages('billing_link_ranking', links_data='[{"url": "https://a.example/billing"}]')
+    second = PromptLibrary.get_messages('billing_link_ranking', links_data='[{"url": "https://b.example/history"}]')
+
+    assert first[0] == second[0]
+    assert "a.example" not in first[0]["content"]
+    assert first[1] == {"role": "user", "content": 'LINKS_DATA:\n[{"url": "https://a.example/billing"}]'}
@@ -0,0 +1,28 @@
+"""Tests for shared HTML helpers"""
+
+from types import SimpleNamespace
+
+import utils.utils as utils_module
+from utils.utils import truncate_html_content
+
+
+class CharTokenizer:
+    """One token per character, so offsets are easy to check"""
+
+    def encode(self, text):
+        return SimpleNamespace(ids=list(text), offsets=[(i, i + 1) for i in range(len(text))])
+
+
+def test_truncate_without_tokenizer_uses_character_budget(monkeypatch):
+    monkeypatch.setattr(utils_module, "_get_tokenizer", lambda: None)
+    assert truncate_html_content("x" * 50, max_length=10) == "x" * 10
+
+
+def test_truncate_with_tokenizer_keeps_character_budget(monkeypatch):
+    monkeypatch.setattr(utils_module, "_get_tokenizer", lambda: CharTokenizer())
+    assert truncate_html_content("x" * 50, max_length=10, max_tokens=40) == "x" * 10
+
+
+def test_truncate_with_tokenizer_applies_token_budget(monkeypatch):
+    monkeypatch.setattr(utils_module, "_get_tokenizer", lambda: CharTokenizer())
+    assert truncate_html_content("x" * 50, max_length=40, max_tokens=10) == "x" * 10
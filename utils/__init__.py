@@ -5,26 +5,50 @@ Centralized collection of utility modules for AutoBilling
 """
 
 from .config import *
-from .utils import BillInfo, human_like_delay, has_meaningful_billing_data
+from .utils import BillInfo, human_like_delay, has_meaningful_billing_data, get_relevant_html
 from .login_handler import LoginHandler
 from .extraction_strategies import SmartExtractionOrchestrator
 from .prompts import PromptLibrary
+from .llm_client import llm_client
 
 __all__ = [
     'BillInfo',
     'human_like_delay', 
     'has_meaningful_billing_data',
+    'get_relevant_html',
     'LoginHandler',
     'SmartExtractionOrchestrator',
     'PromptLibrary',
+    'llm_client',
     # Config constants
     'OLLAMA_MODEL',
+    'OLLAMA_HOST',
+    'OLLAMA_KEEP_ALIVE',
+    'OLLAMA_KEEP_ALIVE_AFTER_RUN',
+    'LLM_NUM_CTX',
+    'LLM_FAST_OPTIONS',
     'HEADLESS_BROWSER',
     'SHOW_BROWSER',
     'USER_AGENT',
     'CHROME_OPTIONS',
-    'PAGE_LOAD_DELAY',
     'DEBUG_MODE',
     'VERBOSE_OUTPUT',
-    'BROWSER_WINDOW_SIZE'
+    'BROWSER_WINDOW_SIZE',
+    'LOGIN_FORM_SELECTORS',
+    'LOGIN_FORM_WAIT',
+    'LOGIN_FIELD_SELECTORS',
+    'SIGNED_IN_SELECTORS',
+    'PAGE_LOAD_STRATEGY',
+    'CREDENTIALS_FILE',
+    'BLOCK_IMAGES',
+    'CHROME_CONTENT_PREFS',
+    'BLOCK_STYLESHEETS',
+    'POST_LOGIN_WAIT',
+    'LOGIN_REDIRECT_WAIT',
+    'CHROMEDRIVER_PATH_CACHE',
+    'PRETTY_TABLES',
+    'BLOCKED_URL_PATTERNS',
+    'CHROME_PROFILE_DIR',
+    'BLOCK_FONTS',
+    'FONT_URL_PATTERNS'
 ] 
\ No newline at end of file
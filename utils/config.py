@@ -11,7 +11,22 @@ All constants and settings in one place
 
 # AI Model Configuration
 OLLAMA_MODEL = "qwen2.5:latest"
+OLLAMA_MODEL_FAST = "qwen2.5:3b-instruct-q4_K_M"  # Quantized model for short navigation/filtering prompts
 VISION_MODEL = "qwen2.5vl:7b"
+OLLAMA_HOST = "http://localhost:11434"  # Used for the lightweight /api/tags health check
+OLLAMA_TIMEOUT = 180  # Seconds the pooled client waits on Ollama (covers a cold model load) before giving up on a page
+OLLAMA_KEEP_ALIVE = -1  # Pin loaded models in memory while scraping (-1 = never unload)
+OLLAMA_KEEP_ALIVE_AFTER_RUN = "30m"  # On exit the pin is relaxed to this, so the next run still starts warm
+LLM_CACHE_SIZE = 128  # Identical prompts within a run reuse the cached response
+LLM_CACHE_FILE = ".autobilling_llm_cache"  # Responses reused across runs (None to disable)
+LLM_CACHE_TTL = 86400  # Seconds before an on-disk response is considered stale
+
+# LLM Option Templates
+LLM_NUM_CTX = 8192  # Fits MAX_HTML_LENGTH of page text plus the prompt; preloads use it too so Ollama never reloads
+LLM_FAST_OPTIONS = {"num_predict": 1, "num_ctx": 512, "temperature": 0, "top_p": 1}  # Connectivity probes
+# Greedy decoding for fixed-schema JSON answers: deterministic, so identical pages hit the response cache
+LLM_GREEDY_OPTIONS = {"temperature": 0, "top_k": 1, "repeat_penalty": 1.0, "seed": 0}
+LLM_EXTRACT_OPTIONS = {**LLM_GREEDY_OPTIONS, "num_ctx": LLM_NUM_CTX}  # Agents add their own num_predict
 
 # Browser Configuration
 BROWSER_WINDOW_SIZE = "1920,1080"  # Browser window size
@@ -19,20 +34,38 @@ HEADLESS_BROWSER = False  # Set to True to hide browser window
 SHOW_BROWSER = True       # Set to False to run in headless mode (same as HEADLESS_BROWSER=True)
 DEBUG_MODE = True         # Set to True to see detailed debugging output
 VERBOSE_OUTPUT = True     # Set to True for more detailed status messages
+PAGE_LOAD_STRATEGY = "eager"  # "normal" waits for all subresources, "eager" returns at DOMContentLoaded
 USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
+CHROMEDRIVER_PATH_CACHE = "~/.autobilling/chromedriver_path"  # Skips webdriver-manager's version check
+CHROME_PROFILE_DIR = "~/.autobilling/profile"  # Keeps site cookies between runs (None for a fresh profile)
+
+# Credentials file: {"url": ..., "username": ..., "password": ...}
+CREDENTIALS_FILE = "credentials.json"
+
 # Timing Configuration
 LOGIN_WAIT_TIME = 5
+POST_LOGIN_WAIT = 15      # Max seconds to wait for the URL to change after submitting login
+LOGIN_REDIRECT_WAIT = 10  # Extra seconds to wait for a redirect off the login page before refreshing
+LOGIN_CACHE_FILE = ".autobilling_login_cache"  # Detected login selectors per page (None to disable)
 EXPLORATION_THRESHOLD = 70
+PAGE_CACHE_SIZE = 32  # Pages (by HTML hash) whose quality score is kept for revisits
+SUFFICIENT_BILL_COUNT = 4  # Bills from one page that end exploration without re-scoring it (the 4+ months goal)
 MAX_EXPLORATION_TIME = 180  # 3 minutes
 SPA_CONTENT_WAIT = 3
+SPA_RERENDER_WAIT = 2  # Seconds a page matching an explored one gets to re-render before it is skipped
 MAX_HTML_LENGTH = 15000
+MAX_HTML_TOKENS = 6000  # Token budget for page HTML in prompts (used when `tokenizers` is installed)
+TOKENIZER_NAME = "Qwen/Qwen2.5-7B"  # tokenizer.json path, or a Hugging Face id already in the local cache (never downloaded)
 
 # Extraction Configuration
 MAX_TOTAL_TRANSACTIONS = 50
 MAX_CONTAINER_TRANSACTIONS = 20
 MAX_BILLING_HISTORY_MONTHS = 24
 
+# Output Configuration
+PRETTY_TABLES = False  # True = render tables with tabulate (also --pretty), False = built-in single-pass grid formatter
+
 # Amount Validation
 MIN_UTILITY_AMOUNT = 1.0
 MAX_UTILITY_AMOUNT = 5000.0
@@ -42,7 +75,6 @@ MAX_YEARS_BACK = 15
 MAX_YEARS_FORWARD = 2
 
 # Delay Ranges (for human-like behavior)
-PAGE_LOAD_DELAY = (1.0, 2.0)
 HUMAN_DELAY = (0.5, 2.0)
 TYPING_DELAY = (0.05, 0.15)
 
@@ -50,6 +82,13 @@ TYPING_DELAY = (0.05, 0.15)
 SPA_LOADING_SELECTORS = ".loading, .spinner, mat-spinner, .mat-progress-spinner, .loading-overlay"
 SPA_CONTENT_SELECTORS = "mat-card, .mat-card, [role='main'], main, .content, nav, table"
 
+# CSS Selectors for Login Page Readiness
+LOGIN_FORM_SELECTORS = "input[type='password'], input[type='email'], form"
+LOGIN_FORM_WAIT = 10  # Max seconds to wait for JS-rendered login forms
+LOGIN_FIELD_SELECTORS = "input[type='password'], input[type='email'], input[autocomplete='username']"  # Any of these means not signed in
+# Sign-out links only rendered once a session is active
+SIGNED_IN_SELECTORS = "a[href*='logout' i], a[href*='signout' i], a[href*='sign-out' i], a[href*='log-out' i], a[href*='logoff' i]"
+
 # Billing Keywords
 BILLING_KEYWORDS = [
     'payment', 'charge', 'bill', 'billing', 'invoice', 'statement', 'balance', 'due', 'amount',
@@ -80,6 +119,7 @@ CHROME_OPTIONS = [
     f"--window-size={BROWSER_WINDOW_SIZE}",
     "--disable-blink-features=AutomationControlled",
     "--disable-extensions",
+    "--disable-plugins",
     "--disable-plugins-discovery",
     "--disable-web-security",
     "--allow-running-insecure-content",
@@ -99,8 +139,35 @@ CHROME_OPTIONS = [
     "--disable-ipc-flooding-protection",
     # Remove problematic options that might cause crashes on macOS
     "--disable-software-rasterizer",
-    "--use-mock-keychain"  # Prevent keychain access issues on macOS
+    "--use-mock-keychain",  # Prevent keychain access issues on macOS
+    # Skip background traffic that doesn't help scraping
+    "--disable-background-networking",
+    "--disable-sync",
+    "--disable-translate"
+]
+
+# Skip image downloads - login detection and extraction only need DOM + text
+BLOCK_IMAGES = True
+CHROME_CONTENT_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.default_content_setting_values.notifications": 2,
+}
+# Also skip stylesheets in headless runs (off by default: some login forms rely on computed styles)
+BLOCK_STYLESHEETS = False
+
+# Analytics/ad hosts blocked through CDP (Network.setBlockedURLs) - never needed for scraping
+BLOCKED_URL_PATTERNS = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*hotjar.com*",
+    "*segment.io*",
+    "*facebook.net*",
+    "*fullstory.com*"
 ]
+# Web fonts only affect rendering, so they are blocked through the same CDP list
+BLOCK_FONTS = True
+FONT_URL_PATTERNS = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*fonts.googleapis.com*", "*fonts.gstatic.com*"]
 
 # Regular Expression Patterns
 DATE_PATTERNS = [
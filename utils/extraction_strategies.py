@@ -8,23 +8,27 @@ import re
 import json
 import base64
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urljoin
 from abc import ABC, abstractmethod
+from operator import itemgetter
 from typing import Dict, List, Optional
 from datetime import datetime
 
-import ollama
-from bs4 import BeautifulSoup
 
 from .config import (
     OLLAMA_MODEL, VISION_MODEL, USER_AGENT, MAX_HTML_LENGTH,
     DATE_PATTERNS, AMOUNT_PATTERNS, MAX_TOTAL_TRANSACTIONS,
-    MIN_UTILITY_AMOUNT, MAX_UTILITY_AMOUNT
+    MIN_UTILITY_AMOUNT, MAX_UTILITY_AMOUNT, LLM_EXTRACT_OPTIONS, LLM_GREEDY_OPTIONS, DEBUG_MODE
 )
 from .utils import (
     BillInfo, extract_dates_and_amounts, parse_date_flexible,
     is_valid_utility_date, deduplicate_transactions, has_meaningful_billing_data,
-    extract_account_number_from_url, truncate_html_content
+    extract_account_number_from_url, extract_billing_relevant_html, parse_html, get_page_text,
+    JSON_OBJECT_RE
 )
+from .llm_client import llm_client
 
 # Check for Vision AI availability
 try:
@@ -33,6 +37,75 @@ try:
 except ImportError:
     VISION_AI_AVAILABLE = False
 
+# Common API patterns, combined into one alternation so the page is scanned once
+API_ENDPOINT_KEYWORD_RE = re.compile(r'billing|transaction|history', re.IGNORECASE)
+API_ENDPOINT_RE = re.compile(
+    r'["\']([^"\']*\/api\/[^"\']*(?:billing|transaction|history)[^"\']*)["\']'
+    r'|fetch\s*\(\s*["\']([^"\']+)["\']'
+    r'|axios\.get\s*\(\s*["\']([^"\']+)["\']',
+    re.IGNORECASE
+)
+
+# Rows describing a payment rather than a bill
+PAYMENT_ROW_RE = re.compile(r'payment|paid|credit', re.IGNORECASE)
+
+# Sort key for bill/transaction dicts by date
+BY_DATE = itemgetter('date')
+
+# A dollar amount that starts and ends on a digit-run boundary (1,234.56 / 45.10 / 1234) - the lookarounds stop
+# the engine from retrying at every offset of long numeric literals (session ids, embedded JSON)
+AMOUNT_VALUE = r'(?<![\d,.])\d{1,4}(?:,\d{3})*(?:\.\d{2})?(?!\d)'
+
+# Dashboard fallback amounts ($12.34 / 12.34 dollars / amount: 12.34) in one pass over the page text
+FALLBACK_AMOUNT_RE = re.compile(
+    rf'\$\s*({AMOUNT_VALUE})'
+    rf'|({AMOUNT_VALUE})\s*dollars?'
+    rf'|amount:?\s*\$?({AMOUNT_VALUE})',
+    re.IGNORECASE
+)
+
+# Dashboard amounts with context: one pass per category, the matching group is named after the amount
+# type (priority order between types is applied per month later). Keyword gaps are capped at 100 characters
+# so stacked wildcards can't backtrack across a whole line of page text
+DASHBOARD_AMOUNT_RES = (
+    # Current bill patterns
+    re.compile(
+        rf'current.{{0,100}}bill.{{0,100}}amount.{{0,100}}\$?(?P<current_bill>{AMOUNT_VALUE})'
+        rf'|amount.{{0,100}}due.{{0,100}}\$?(?P<amount_due>{AMOUNT_VALUE})'
+        rf'|balance.{{0,100}}\$?(?P<balance>{AMOUNT_VALUE})'
+        rf'|bill.{{0,100}}amount.{{0,100}}\$?(?P<bill_amount>{AMOUNT_VALUE})',
+        re.IGNORECASE
+    ),
+    # Payment patterns
+    re.compile(
+        rf'last.{{0,100}}payment.{{0,100}}\$?(?P<last_payment>{AMOUNT_VALUE})'
+        rf'|payment.{{0,100}}amount.{{0,100}}\$?(?P<payment_amount>{AMOUNT_VALUE})'
+        rf'|paid.{{0,100}}\$?(?P<paid_amount>{AMOUNT_VALUE})',
+        re.IGNORECASE
+    ),
+    # General amount patterns
+    re.compile(rf'\$\s*(?P<dollar_amount>{AMOUNT_VALUE})')
+)
+DASHBOARD_DATE_RES = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r'(?:paid|due|on)\s+([a-zA-Z]+ \d{1,2},? \d{4})',  # "paid July 17, 2025"
+    r'(\d{1,2}/\d{1,2}/\d{4})',  # "07/17/2025"
+    r'(\d{4}-\d{1,2}-\d{1,2})',  # "2025-07-17"
+    r'([a-zA-Z]+ \d{4})',  # "July 2025"
+]]
+
+# Header/cell words that mark a table as a transaction table
+TABLE_KEYWORD_RE = re.compile(r'date|amount|transaction|bill', re.IGNORECASE)
+
+# Class names of non-table transaction containers (bs4 tests each class and the joined class string)
+CONTAINER_CLASS_RE = re.compile(r'transaction|billing|history')
+
+# Cheap gate before the AI HTML call - page text with none of these can't yield billing data
+FINANCIAL_SIGNAL_RE = re.compile(r'\$|bill|balance|amount\s*due', re.IGNORECASE)
+
+# Table-row pre-pass before AI extraction: a currency amount ("-" marks a payment/credit) and any known date format
+ROW_AMOUNT_RE = re.compile(r'(-?)\$\s?(\d{1,4}(?:,\d{3})*\.\d{2})(?!\d)')
+ROW_DATE_RE = re.compile('|'.join(DATE_PATTERNS))
+
 class ExtractionStrategy(ABC):
     """Abstract base class for extraction strategies"""
     
@@ -46,6 +119,12 @@ class APIExtractionStrategy(ExtractionStrategy):
     
     def __init__(self):
         self.session_cookies = {}
+        # One pooled session for every API call in the run - keeps TCP/TLS connections to the utility site alive
+        self.http = requests.Session()
+        self.http.headers.update({'User-Agent': USER_AGENT, 'Accept': 'application/json'})
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=Retry(total=2, backoff_factor=0.3))
+        self.http.mount('https://', adapter)
+        self.http.mount('http://', adapter)
     
     def extract(self, page_source: str, driver=None) -> BillInfo:
         """Try to find and call billing APIs"""
@@ -54,16 +133,16 @@ class APIExtractionStrategy(ExtractionStrategy):
         if not driver:
             return BillInfo("No driver", 0.0, "API extraction needs driver", 0.0)
         
-        # Get session cookies for authentication
-        cookies = driver.get_cookies()
-        self.session_cookies = {cookie['name']: cookie['value'] for cookie in cookies}
-        
         # Extract API endpoints from page
         api_endpoints = self._extract_api_endpoints(page_source, driver.current_url)
         
         if not api_endpoints:
             return BillInfo("No APIs found", 0.0, "No API endpoints detected", 0.0)
         
+        # Get session cookies for authentication (only once there is something to call)
+        cookies = driver.get_cookies()
+        self.session_cookies = {cookie['name']: cookie['value'] for cookie in cookies}
+        
         # Try each API endpoint
         for endpoint in api_endpoints:
             api_data = self._call_api(endpoint)
@@ -75,42 +154,27 @@ class APIExtractionStrategy(ExtractionStrategy):
     def _extract_api_endpoints(self, html_content: str, current_url: str) -> List[Dict]:
         """Extract potential API endpoints from JavaScript"""
         endpoints = []
-        base_url = '/'.join(current_url.split('/')[:3])
-        
-        # Common API patterns
-        api_patterns = [
-            r'["\']([^"\']*\/api\/[^"\']*billing[^"\']*)["\']',
-            r'["\']([^"\']*\/api\/[^"\']*transaction[^"\']*)["\']',
-            r'["\']([^"\']*\/api\/[^"\']*history[^"\']*)["\']',
-            r'fetch\s*\(\s*["\']([^"\']+)["\']',
-            r'axios\.get\s*\(\s*["\']([^"\']+)["\']'
-        ]
         
-        for pattern in api_patterns:
-            matches = re.findall(pattern, html_content, re.IGNORECASE)
-            for match in matches:
-                if any(keyword in match.lower() for keyword in ['billing', 'transaction', 'history']):
-                    full_url = base_url + match if match.startswith('/') else match
-                    endpoints.append({
-                        'url': full_url,
-                        'method': 'GET',
-                        'type': 'api'
-                    })
+        # Single pass over the page; stop as soon as we have enough candidates
+        for match in API_ENDPOINT_RE.finditer(html_content):
+            url = next(group for group in match.groups() if group)
+            if API_ENDPOINT_KEYWORD_RE.search(url):
+                endpoints.append({
+                    'url': urljoin(current_url, url),
+                    'method': 'GET',
+                    'type': 'api'
+                })
+                if len(endpoints) >= 10:  # Limit to top 10
+                    break
         
-        return endpoints[:10]  # Limit to top 10
+        return endpoints
     
     def _call_api(self, endpoint: Dict) -> Optional[Dict]:
         """Call API endpoint with session authentication"""
         try:
-            headers = {
-                'User-Agent': USER_AGENT,
-                'Accept': 'application/json',
-                'Referer': endpoint['url']
-            }
-            
-            response = requests.get(
+            response = self.http.get(
                 endpoint['url'],
-                headers=headers,
+                headers={'Referer': endpoint['url']},
                 cookies=self.session_cookies,
                 timeout=10
             )
@@ -188,31 +252,71 @@ class HTMLExtractionStrategy(ExtractionStrategy):
         """Extract billing data from HTML"""
         print("🔍 Trying HTML extraction...")
         
-        soup = BeautifulSoup(page_source, 'html.parser')
+        soup = parse_html(page_source)
         
         # Find transaction containers
         transaction_containers = self._find_transaction_containers(soup)
         
         if not transaction_containers:
-            # Try AI-powered extraction as fallback
-            ai_result = self._try_ai_html_extraction(page_source)
-            if ai_result and hasattr(ai_result, 'all_bills') and ai_result.all_bills:
-                return ai_result
-            return self._extract_dashboard_amounts(soup, driver)
+            return self._extract_without_containers(page_source, soup, driver)
         
         # Extract historical data
         historical_data = self._extract_historical_transactions(transaction_containers)
         
         if not historical_data:
-            # Try AI-powered extraction as fallback
-            ai_result = self._try_ai_html_extraction(page_source)
-            if ai_result and hasattr(ai_result, 'all_bills') and ai_result.all_bills:
-                return ai_result
-            return self._extract_dashboard_amounts(soup, driver)
+            return self._extract_without_containers(page_source, soup, driver)
         
         # Process and return results
         return self._create_bill_info(historical_data, driver)
     
+    def _extract_without_containers(self, page_source: str, soup, driver) -> BillInfo:
+        """Fallback chain when no transaction containers yield data: table rows, then AI, then dashboard amounts"""
+        row_result = self._extract_table_row_amounts(soup, driver)
+        if row_result:
+            return row_result
+        
+        if not FINANCIAL_SIGNAL_RE.search(get_page_text(page_source)):
+            print("⏭️ No amounts or billing keywords in page text - skipping AI extraction")
+            return self._extract_dashboard_amounts(page_source, driver)
+        
+        # Try AI-powered extraction as fallback
+        ai_result = self._try_ai_html_extraction(page_source)
+        if ai_result and hasattr(ai_result, 'all_bills') and ai_result.all_bills:
+            return ai_result
+        return self._extract_dashboard_amounts(page_source, driver)
+    
+    def _extract_table_row_amounts(self, soup, driver) -> Optional[BillInfo]:
+        """Pair dated table rows with their currency amount - skips the AI call when 2+ rows are found"""
+        transactions = []
+        for row in soup.find_all('tr'):
+            row_text = row.get_text(' ', strip=True)
+            amount_match = ROW_AMOUNT_RE.search(row_text)
+            date_match = ROW_DATE_RE.search(row_text) if amount_match else None
+            if not date_match:
+                continue
+            
+            parsed_date = parse_date_flexible(date_match.group(0))
+            amount = float(amount_match.group(2).replace(',', ''))
+            if not parsed_date or not is_valid_utility_date(parsed_date):
+                continue
+            if not MIN_UTILITY_AMOUNT <= amount <= MAX_UTILITY_AMOUNT:
+                continue
+            
+            transactions.append({
+                'date': parsed_date,
+                'amount': amount,
+                'type': 'payment' if amount_match.group(1) else 'bill',
+                'description': row_text[:100]
+            })
+            if len(transactions) >= MAX_TOTAL_TRANSACTIONS:
+                break
+        
+        if len(transactions) < 2:
+            return None
+        
+        print(f"📋 Found {len(transactions)} dated amounts in table rows - skipping AI extraction")
+        return self._create_bill_info(transactions, driver)
+    
     def _find_transaction_containers(self, soup) -> List:
         """Find elements likely to contain transaction data"""
         containers = []
@@ -220,25 +324,35 @@ class HTMLExtractionStrategy(ExtractionStrategy):
         # Look for tables first (most reliable)
         tables = soup.find_all('table')
         for table in tables:
-            table_text = table.get_text().lower()
-            if any(keyword in table_text for keyword in ['date', 'amount', 'transaction', 'bill']):
-                if len(table.find_all('tr')) >= 3:  # At least header + 2 rows
-                    containers.append(table)
+            if len(table.find_all('tr', limit=3)) < 3:  # At least header + 2 rows
+                continue
+            # Scan text nodes and stop at the first keyword instead of joining the whole table's text
+            if any(TABLE_KEYWORD_RE.search(text) for text in table.strings):
+                containers.append(table)
         
         # Look for other structured containers if no good tables
         if len(containers) < 1:
-            selectors = ['[class*="transaction"]', '[class*="billing"]', '[class*="history"]']
-            for selector in selectors:
-                elements = soup.select(selector)
-                for element in elements:
-                    if len(element.get_text()) > 100:  # Has substantial content
-                        containers.append(element)
+            # One find_all walk with a class regex - an element matching several classes is returned once
+            for element in soup.find_all(class_=CONTAINER_CLASS_RE):
+                if self._has_text_longer_than(element, 100):  # Has substantial content
+                    containers.append(element)
         
         return containers
     
+    @staticmethod
+    def _has_text_longer_than(element, limit: int) -> bool:
+        """Sum text node lengths until limit is passed, without building the element's full text"""
+        length = 0
+        for text in element.strings:
+            length += len(text)
+            if length > limit:
+                return True
+        return False
+    
     def _extract_historical_transactions(self, containers: List) -> List[Dict]:
         """Extract transaction data from containers"""
         historical_data = []
+        seen_rows = set()  # Nested tables/containers share rows - scan each row once
         
         for container in containers:
             # Find rows within container
@@ -248,13 +362,16 @@ class HTMLExtractionStrategy(ExtractionStrategy):
                 rows = container.find_all(['div', 'tr', 'li'])
             
             for row in rows:
+                if id(row) in seen_rows:
+                    continue
+                seen_rows.add(id(row))
                 row_text = row.get_text()
                 transactions = extract_dates_and_amounts(row_text)
                 
                 for transaction in transactions:
                     # Determine transaction type
                     transaction_type = 'bill'
-                    if any(word in row_text.lower() for word in ['payment', 'paid', 'credit']):
+                    if PAYMENT_ROW_RE.search(row_text):
                         transaction_type = 'payment'
                     
                     historical_data.append({
@@ -270,44 +387,21 @@ class HTMLExtractionStrategy(ExtractionStrategy):
         
         return deduplicate_transactions(historical_data)
     
-    def _extract_dashboard_amounts(self, soup, driver) -> BillInfo:
+    def _extract_dashboard_amounts(self, page_source: str, driver) -> BillInfo:
         """Extract billing amounts from dashboard/overview pages"""
         print("🏠 Extracting dashboard billing amounts...")
         
         amounts = []
         dates = []
         
-        # Enhanced dashboard patterns for SPA applications
-        dashboard_patterns = [
-            # Current bill patterns
-            (r'current.*bill.*amount.*\$?([\d,]+\.?\d*)', 'current_bill'),
-            (r'amount.*due.*\$?([\d,]+\.?\d*)', 'amount_due'),
-            (r'balance.*\$?([\d,]+\.?\d*)', 'balance'),
-            (r'bill.*amount.*\$?([\d,]+\.?\d*)', 'bill_amount'),
-            # Payment patterns  
-            (r'last.*payment.*\$?([\d,]+\.?\d*)', 'last_payment'),
-            (r'payment.*amount.*\$?([\d,]+\.?\d*)', 'payment_amount'),
-            (r'paid.*\$?([\d,]+\.?\d*)', 'paid_amount'),
-            # General amount patterns
-            (r'\$\s*([\d,]+\.?\d*)', 'dollar_amount')
-        ]
-        
-        # Date patterns for dashboard
-        date_patterns = [
-            r'(?:paid|due|on)\s+([a-zA-Z]+ \d{1,2},? \d{4})',  # "paid July 17, 2025"
-            r'(\d{1,2}/\d{1,2}/\d{4})',  # "07/17/2025"
-            r'(\d{4}-\d{1,2}-\d{1,2})',  # "2025-07-17"
-            r'([a-zA-Z]+ \d{4})',  # "July 2025"
-        ]
-        
-        page_text = soup.get_text()
+        page_text = get_page_text(page_source)
         
         # Extract amounts with context
-        for pattern, amount_type in dashboard_patterns:
-            matches = re.finditer(pattern, page_text, re.IGNORECASE)
-            for match in matches:
+        for amount_re in DASHBOARD_AMOUNT_RES:
+            for match in amount_re.finditer(page_text):
                 try:
-                    amount_str = match.group(1).replace(',', '')
+                    amount_type = match.lastgroup
+                    amount_str = match.group(amount_type).replace(',', '')
                     amount = float(amount_str)
                     if amount > 0 and amount < 10000:  # Reasonable utility bill range
                         # Try to find associated date near this amount
@@ -317,8 +411,8 @@ class HTMLExtractionStrategy(ExtractionStrategy):
                         
                         # Look for date in context
                         amount_date = None
-                        for date_pattern in date_patterns:
-                            date_match = re.search(date_pattern, context, re.IGNORECASE)
+                        for date_re in DASHBOARD_DATE_RES:
+                            date_match = date_re.search(context)
                             if date_match:
                                 try:
                                     date_str = date_match.group(1)
@@ -353,7 +447,7 @@ class HTMLExtractionStrategy(ExtractionStrategy):
         # If we found amounts, create BillInfo
         if amounts:
             # Sort by date (newest first)
-            amounts.sort(key=lambda x: x['date'], reverse=True)
+            amounts.sort(key=BY_DATE, reverse=True)
             
             # Apply latest-per-month filtering
             monthly_latest = {}
@@ -401,7 +495,7 @@ class HTMLExtractionStrategy(ExtractionStrategy):
             # Remove the amount_type field before returning (not needed in BillInfo)
             for bill in filtered_bills:
                 bill.pop('amount_type', None)
-            filtered_bills.sort(key=lambda x: x['date'], reverse=True)
+            filtered_bills.sort(key=BY_DATE, reverse=True)
             
             if filtered_bills:
                 current_bill = filtered_bills[0]
@@ -421,25 +515,11 @@ class HTMLExtractionStrategy(ExtractionStrategy):
                 print(f"📊 Dashboard extraction: {len(filtered_bills)} bills from {len(amounts)} total amounts")
                 return result
         
-        # Original fallback logic
-        current_amount = 0.0
-        
-        # Look for simple amount patterns
-        amount_patterns = [
-            r'\$\s*([\d,]+\.?\d*)',
-            r'([\d,]+\.?\d*)\s*dollars?',
-            r'amount:?\s*\$?([\d,]+\.?\d*)'
-        ]
-        
-        for pattern in amount_patterns:
-            matches = re.findall(pattern, page_text, re.IGNORECASE)
-            for match in matches:
-                try:
-                    amount = float(match.replace(',', ''))
-                    if 10.0 <= amount <= 5000.0:  # Reasonable utility bill range
-                        current_amount = max(current_amount, amount)
-                except ValueError:
-                    continue
+        # Original fallback logic: largest simple amount in the reasonable utility bill range
+        # (AMOUNT_VALUE only matches parseable numbers, so no per-match try/except)
+        fallback_amounts = [float(match.group(match.lastindex).replace(',', ''))
+                            for match in FALLBACK_AMOUNT_RE.finditer(page_text)]
+        current_amount = max((amount for amount in fallback_amounts if 10.0 <= amount <= 5000.0), default=0.0)
         
         if current_amount > 0:
             account_number = extract_account_number_from_url(driver.current_url) if driver else None
@@ -460,7 +540,7 @@ class HTMLExtractionStrategy(ExtractionStrategy):
             return BillInfo("No transactions", 0.0, "No valid transactions", 0.0)
         
         # Sort by date (newest first)
-        transactions.sort(key=lambda x: x['date'], reverse=True)
+        transactions.sort(key=BY_DATE, reverse=True)
         
         # Group by month and keep only the latest date from each month
         monthly_latest = {}
@@ -474,7 +554,7 @@ class HTMLExtractionStrategy(ExtractionStrategy):
         
         # Convert back to list and sort by date (newest first)
         filtered_bills = list(monthly_latest.values())
-        filtered_bills.sort(key=lambda x: x['date'], reverse=True)
+        filtered_bills.sort(key=BY_DATE, reverse=True)
         
         # Filter to bills only for current/previous
         bills = [t for t in filtered_bills if t['type'] == 'bill']
@@ -507,45 +587,31 @@ class HTMLExtractionStrategy(ExtractionStrategy):
         try:
             print("🤖 Trying AI-powered HTML extraction...")
             
-            # Prepare clean HTML content for AI
-            soup = BeautifulSoup(page_source, 'html.parser')
-            
-            # Remove script, style, and other non-content elements
-            for element in soup(['script', 'style', 'nav', 'header', 'footer']):
-                element.decompose()
-                
-            # Get relevant HTML content
-            html_text = str(soup)[:10000]  # Limit size for AI processing
+            # Cleaned page, condensed to its billing tables/containers when it won't fit the prompt
+            html_text = extract_billing_relevant_html(page_source, 10000)  # Limit size for AI processing
             
             # Get AI extraction using the new prompt
             from .prompts import PromptLibrary
             
-            prompt = PromptLibrary.get_prompt('html_extraction', html_content=html_text)
+            messages = PromptLibrary.get_messages('html_extraction', html_content=html_text)
             
-            import ollama
             from .config import OLLAMA_MODEL
             
-            response = ollama.chat(
+            response = llm_client.chat_json(
                 model=OLLAMA_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                options={
-                    "temperature": 0.1,
-                    "num_predict": 1000
-                }
+                messages=messages,
+                options={**LLM_EXTRACT_OPTIONS, "num_predict": 1000}
             )
             
             response_content = response["message"]["content"]
             print(f"🤖 AI HTML extraction response preview: {response_content[:150]}...")
             
             # Parse AI response
-            import json
-            import re
-            
             try:
                 ai_result = json.loads(response_content)
             except json.JSONDecodeError:
                 # Try to extract JSON from response
-                json_match = re.search(r'\{.*\}', response_content, re.DOTALL)
+                json_match = JSON_OBJECT_RE.search(response_content)
                 if json_match:
                     ai_result = json.loads(json_match.group())
                 else:
@@ -605,13 +671,15 @@ class VisionAIExtractionStrategy(ExtractionStrategy):
         print("📸 Taking screenshot for Vision AI...")
         
         try:
-            # Take screenshot
-            screenshot_path = "/tmp/autobilling_screenshot.png"
-            driver.save_screenshot(screenshot_path)
+            # Take screenshot straight to base64 (no temp file round-trip)
+            image_base64 = driver.get_screenshot_as_base64()
             
-            # Convert to base64
-            with open(screenshot_path, "rb") as image_file:
-                image_base64 = base64.b64encode(image_file.read()).decode('utf-8')
+            # Keep a copy on disk only when debugging
+            if DEBUG_MODE:
+                screenshot_path = "/tmp/autobilling_screenshot.png"
+                with open(screenshot_path, "wb") as image_file:
+                    image_file.write(base64.b64decode(image_base64))
+                print(f"📁 Saved screenshot to: {screenshot_path}")
             
             # Analyze with Vision AI
             return self._analyze_screenshot(image_base64)
@@ -622,50 +690,29 @@ class VisionAIExtractionStrategy(ExtractionStrategy):
     
     def _analyze_screenshot(self, image_base64: str) -> BillInfo:
         """Analyze screenshot with Vision AI"""
-        vision_prompt = """
-        Extract billing data from this utility website screenshot.
-        
-        Look for:
-        - Bill amounts and dates in tables
-        - Transaction history 
-        - Payment records
-        - Account information
-        
-        Return JSON:
-        {
-            "bills": [
-                {
-                    "date": "MM/DD/YYYY", 
-                    "amount": 199.00,
-                    "description": "Bill description",
-                    "type": "bill"
-                }
-            ],
-            "account_info": {
-                "account_number": "if visible"
-            }
-        }
-        
-        Extract ALL visible billing entries. Be precise with dates and amounts.
-        """
+        from .prompts import PromptLibrary
+        vision_prompt = PromptLibrary.get_prompt('vision_screenshot_extraction')
         
         try:
-            response = ollama.chat(
+            response = llm_client.chat_json(
                 model=VISION_MODEL,
                 messages=[{
                     'role': 'user',
                     'content': vision_prompt,
                     'images': [image_base64]
                 }],
-                options={'temperature': 0.1}
+                options={**LLM_GREEDY_OPTIONS, "num_predict": 1000}  # Same bounded bills schema as the HTML prompt
             )
             
-            # Parse response
+            # JSON mode returns the object directly; only salvage with the regex if decoding was cut short
             vision_response = response['message']['content']
-            json_match = re.search(r'\{.*\}', vision_response, re.DOTALL)
+            try:
+                billing_data = json.loads(vision_response)
+            except json.JSONDecodeError:
+                json_match = JSON_OBJECT_RE.search(vision_response)
+                billing_data = json.loads(json_match.group()) if json_match else None
             
-            if json_match:
-                billing_data = json.loads(json_match.group())
+            if billing_data:
                 return self._create_bill_info_from_vision(billing_data)
             
         except Exception as e:
@@ -701,7 +748,7 @@ class VisionAIExtractionStrategy(ExtractionStrategy):
             return BillInfo("No valid vision data", 0.0, "Could not parse vision data", 0.0)
         
         # Sort by date
-        processed_bills.sort(key=lambda x: x['date'], reverse=True)
+        processed_bills.sort(key=BY_DATE, reverse=True)
         
         current_bill = processed_bills[0]
         previous_bill = processed_bills[1] if len(processed_bills) > 1 else None
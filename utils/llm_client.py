@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+LLM Client for AutoBilling
+Single entry point for Ollama chat calls with per-run response caching
+"""
+
+import time
+import json
+import shelve
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import ollama
+
+from .config import (
+    OLLAMA_MODEL, OLLAMA_MODEL_FAST, OLLAMA_HOST, OLLAMA_TIMEOUT, OLLAMA_KEEP_ALIVE, OLLAMA_KEEP_ALIVE_AFTER_RUN,
+    LLM_CACHE_SIZE, LLM_CACHE_FILE, LLM_CACHE_TTL, DEBUG_MODE
+)
+
+
+class LLMClient:
+    """Wraps Ollama chat calls (one pooled HTTP client) with an LRU cache (plus an on-disk cache) keyed by model, messages and options"""
+
+    def __init__(self, max_entries: int = LLM_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.fast_model = OLLAMA_MODEL_FAST  # Swapped for OLLAMA_MODEL if it can't be loaded
+        self.read_disk_cache = True  # --no-cache: skip disk lookups but still record responses
+        self.ollama = ollama.Client(host=OLLAMA_HOST, timeout=OLLAMA_TIMEOUT)  # Reuses its HTTP connection across calls
+        self.models_used = set()
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cache_key(model: str, messages: List[Dict], options: Optional[Dict], format: str = '') -> tuple:
+        """Build a hashable key for a chat request"""
+        messages_hash = hashlib.sha256(
+            json.dumps(messages, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        options_key = tuple(sorted((options or {}).items()))
+        return (model, messages_hash, options_key, format)
+
+    def _lookup(self, key: tuple, model: str):
+        """Return a cached response for key from memory or disk, or None"""
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                if DEBUG_MODE:
+                    print(f"⚡ LLM cache hit ({model})")
+                return self._cache[key]
+
+        response = self._load_from_disk(key)
+        if response is not None:
+            with self._lock:
+                self._remember(key, response)
+            if DEBUG_MODE:
+                print(f"⚡ LLM disk cache hit ({model})")
+        return response
+
+    def _store(self, key: tuple, response):
+        """Cache a response in memory and on disk"""
+        with self._lock:
+            self._remember(key, response)
+        self._save_to_disk(key, response)
+
+    def _remember(self, key: tuple, response):
+        """Add to the in-memory LRU, evicting the least recently used entry when full (caller holds lock)"""
+        self._cache[key] = response
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _disk_key(key: tuple) -> str:
+        """Stable string key for the shelve file"""
+        return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+    def _load_from_disk(self, key: tuple) -> Optional[Dict]:
+        """Load a response saved by an earlier run if it hasn't expired"""
+        if not LLM_CACHE_FILE or not self.read_disk_cache:
+            return None
+        try:
+            with self._lock, shelve.open(LLM_CACHE_FILE) as cache:
+                entry = cache.get(self._disk_key(key))
+        except Exception as e:
+            if DEBUG_MODE:
+                print(f"   • LLM cache read failed: {e}")
+            return None
+        if entry and time.time() - entry['saved_at'] < LLM_CACHE_TTL:
+            return entry['response']
+        return None
+
+    def _save_to_disk(self, key: tuple, response):
+        """Persist the response text for later runs"""
+        if not LLM_CACHE_FILE:
+            return
+        entry = {
+            'saved_at': time.time(),
+            'response': {"message": {"role": "assistant", "content": response["message"]["content"]}}
+        }
+        try:
+            with self._lock, shelve.open(LLM_CACHE_FILE) as cache:
+                cache[self._disk_key(key)] = entry
+        except Exception as e:
+            if DEBUG_MODE:
+                print(f"   • LLM cache write failed: {e}")
+
+    def chat_until(self, messages: List[Dict], stop_when: Callable[[str], bool],
+                   model: str = OLLAMA_MODEL, options: Optional[Dict] = None, format: str = '') -> Dict:
+        """Stream a chat response and stop generating as soon as stop_when(text) is true"""
+        key = self._cache_key(model, messages, options, format) + ('stream',)
+        cached = self._lookup(key, model)
+        if cached is not None:
+            return cached
+
+        text = ''
+        self.models_used.add(model)
+        stream = self.ollama.chat(model=model, messages=messages, options=options, stream=True,
+                                  format=format, keep_alive=OLLAMA_KEEP_ALIVE)
+        try:
+            for chunk in stream:
+                text += chunk['message']['content']
+                if stop_when(text):
+                    break
+        finally:
+            stream.close()  # Closing the stream drops the HTTP request, which stops Ollama decoding
+
+        response = {"message": {"role": "assistant", "content": text}}
+        self._store(key, response)
+        return response
+
+    def chat_json(self, messages: List[Dict], model: str = OLLAMA_MODEL, options: Optional[Dict] = None) -> Dict:
+        """Ask Ollama for a JSON object (format="json") and stop decoding once it is closed"""
+        return self.chat_until(messages, json_object_closed(), model=model, options=options, format='json')
+
+    def preload(self, model: str, options: Optional[Dict] = None):
+        """Load a model's weights now and pin them for the rest of the run"""
+        self.models_used.add(model)
+        self.ollama.generate(model=model, prompt="", keep_alive=OLLAMA_KEEP_ALIVE, options=options)
+
+    def release(self):
+        """Relax the keep-alive pin on every model used this run (called at exit)"""
+        for model in self.models_used:
+            try:
+                self.ollama.generate(model=model, prompt="", keep_alive=OLLAMA_KEEP_ALIVE_AFTER_RUN)
+            except Exception:
+                pass  # Ollama already stopped
+        self.models_used.clear()
+
+
+def json_object_closed() -> Callable[[str], bool]:
+    """Build a chat_until predicate that fires once the first top-level JSON object is complete"""
+    state = {"pos": 0, "depth": 0, "in_string": False, "escaped": False}
+
+    def closed(text: str) -> bool:
+        for ch in text[state["pos"]:]:
+            state["pos"] += 1
+            if state["in_string"]:
+                if state["escaped"]:
+                    state["escaped"] = False
+                elif ch == '\\':
+                    state["escaped"] = True
+                elif ch == '"':
+                    state["in_string"] = False
+            elif ch == '"' and state["depth"]:
+                state["in_string"] = True
+            elif ch == '{':
+                state["depth"] += 1
+            elif ch == '}' and state["depth"]:
+                state["depth"] -= 1
+                if state["depth"] == 0:
+                    return True
+        return False
+
+    return closed
+
+
+# Shared client for the whole run
+llm_client = LLMClient()
@@ -4,19 +4,107 @@ Login handling for AutoBilling
 Detects and fills login forms using AI and fallback methods
 """
 
-import time
 import json
 import re
+import shelve
+import hashlib
 from typing import Dict, List, Optional
 
-import ollama
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from bs4 import BeautifulSoup
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+from bs4 import BeautifulSoup, SoupStrainer
+import soupsieve
 
-from .config import OLLAMA_MODEL, LOGIN_WAIT_TIME, MAX_HTML_LENGTH, DEBUG_MODE
-from .utils import human_like_delay, human_like_typing, generate_reliable_selector, is_element_visible_and_enabled
+from .config import (
+    OLLAMA_MODEL, LOGIN_WAIT_TIME, MAX_HTML_LENGTH, DEBUG_MODE, LOGIN_CACHE_FILE,
+    LLM_EXTRACT_OPTIONS
+)
+from .utils import (
+    human_like_delay, human_like_typing, generate_reliable_selector, is_element_visible_and_enabled,
+    extract_login_relevant_html, get_relevant_html, HTML_PARSER, JSON_OBJECT_RE
+)
 from .prompts import PromptLibrary
+from .llm_client import llm_client
+
+# Only these tags are needed for login form scanning; skip building the rest of the tree
+DEBUG_SCAN_STRAINER = SoupStrainer(['input', 'button', 'a', 'iframe'])
+LOGIN_FIELD_STRAINER = SoupStrainer(['input', 'button'])
+
+# Fallback detection selectors, most specific first
+FALLBACK_USERNAME_SELECTORS = (
+    "input[type='email']",
+    "input[type='text'][name*='user']",
+    "input[type='text'][id*='user']",
+    "input[type='text'][placeholder*='user']",
+    "input[type='text'][placeholder*='email']",
+    "input[type='text']"  # Generic text input
+)
+FALLBACK_PASSWORD_SELECTORS = ("input[type='password']",)
+FALLBACK_SUBMIT_SELECTORS = (
+    "button[type='submit']",
+    "input[type='submit']",
+    "button:contains('Login')",
+    "button:contains('Sign In')",
+    "button"
+)
+
+# Page text that means the submitted credentials were rejected
+LOGIN_ERROR_INDICATORS = (
+    "invalid username or password",
+    "invalid email or password",
+    "login failed",
+    "authentication failed",
+    "incorrect username",
+    "incorrect password"
+)
+
+# One pass over the page for all indicators
+LOGIN_ERROR_RE = re.compile('|'.join(map(re.escape, LOGIN_ERROR_INDICATORS)))
+
+
+def _has_login_error(page_text: str) -> bool:
+    """Check lowercased page text for any login error message"""
+    return LOGIN_ERROR_RE.search(page_text) is not None
+
+# Resolves the username/password/submit selectors in one WebDriver round-trip
+# (CSS first, then name, then id - the same order as _find_element_universal)
+FIND_LOGIN_ELEMENTS_JS = """
+function find(selector) {
+    if (!selector) return null;
+    try {
+        var element = document.querySelector(selector);
+        if (element) return element;
+    } catch (e) {}
+    return document.getElementsByName(selector)[0] || document.getElementById(selector);
+}
+return [find(arguments[0]), find(arguments[1]), find(arguments[2])];
+"""
+
+
+def _compile_selectors(selectors: tuple) -> tuple:
+    """Pair each selector string with its compiled soupsieve matcher (:contains is spelled :-soup-contains there)"""
+    return tuple((selector, soupsieve.compile(selector.replace(':contains(', ':-soup-contains(')))
+                 for selector in selectors)
+
+
+FALLBACK_USERNAME_MATCHERS = _compile_selectors(FALLBACK_USERNAME_SELECTORS)
+FALLBACK_PASSWORD_MATCHERS = _compile_selectors(FALLBACK_PASSWORD_SELECTORS)
+FALLBACK_SUBMIT_MATCHERS = _compile_selectors(FALLBACK_SUBMIT_SELECTORS)
+# Every candidate field in one tree walk; priority is then resolved against this short list
+FALLBACK_FIELD_UNION = soupsieve.compile(', '.join(
+    selector.replace(':contains(', ':-soup-contains(')
+    for selector in FALLBACK_USERNAME_SELECTORS + FALLBACK_PASSWORD_SELECTORS + FALLBACK_SUBMIT_SELECTORS
+))
+
+
+def _first_matching_selector(matchers: tuple, candidates: List) -> Optional[str]:
+    """Return the highest-priority selector that matches any candidate tag"""
+    for selector, matcher in matchers:
+        if any(matcher.match(tag) for tag in candidates):
+            return selector
+    return None
 
 class LoginHandler:
     """Handles login form detection and authentication"""
@@ -31,7 +119,7 @@ class LoginHandler:
         # Debug: Show what input elements exist on the page
         if DEBUG_MODE:
             try:
-                soup = BeautifulSoup(html_content, 'html.parser')
+                soup = BeautifulSoup(html_content, HTML_PARSER, parse_only=DEBUG_SCAN_STRAINER)
                 inputs = soup.find_all('input')
                 print(f"   • Found {len(inputs)} input elements on page")
                 
@@ -85,21 +173,16 @@ class LoginHandler:
             except Exception as e:
                 print(f"   • Debug element scan failed: {e}")
         
-        # Primary: AI-based detection
-        ai_result = self._ai_login_detection(html_content)
+        # Reuse a previous detection for this exact page if its selectors still work
+        cache_key = self._login_cache_key(html_content)
+        login_data = self._load_cached_login_data(cache_key)
         
-        if ai_result.get("found") and self._verify_selectors(ai_result):
-            print(f"✅ AI detected login form (confidence: {ai_result.get('confidence', 0)}%)")
-            login_data = ai_result
+        if login_data and self._verify_selectors(login_data):
+            print("⚡ Using cached login form detection")
         else:
-            if ai_result.get("error"):
-                print(f"❌ AI detection failed: {ai_result['error']}")
-            else:
-                print("❌ AI detection failed or selectors invalid")
-            
-            # Fallback: HTML-based detection
-            print("🔄 Using fallback login detection...")
-            login_data = self._fallback_login_detection(html_content)
+            login_data = self._detect_login_form(html_content)
+            if login_data.get("found"):
+                self._store_login_data(cache_key, login_data)
         
         if login_data.get("found"):
             print("🔐 Login form found, attempting to login...")
@@ -108,24 +191,77 @@ class LoginHandler:
             print("❌ Login form not found")
             return False
     
+    def _detect_login_form(self, html_content: str) -> Dict:
+        """Detect login form elements, only asking the AI when HTML patterns fall short"""
+        # Fast path: a plain username + password form needs no LLM call
+        pattern_result = self._fallback_login_detection(html_content)
+        
+        if pattern_result.get("found") and self._verify_selectors(pattern_result):
+            print("⚡ Pattern detection resolved login form - skipping AI detection")
+            return pattern_result
+        
+        # AI-based detection for non-standard forms
+        ai_result = self._ai_login_detection(html_content)
+        
+        if ai_result.get("found") and self._verify_selectors(ai_result):
+            print(f"✅ AI detected login form (confidence: {ai_result.get('confidence', 0)}%)")
+            return ai_result
+        
+        if ai_result.get("error"):
+            print(f"❌ AI detection failed: {ai_result['error']}")
+        else:
+            print("❌ AI detection failed or selectors invalid")
+        
+        return pattern_result
+    
+    def _login_cache_key(self, html_content: str) -> str:
+        """Build a cache key from the page URL and a hash of its HTML"""
+        try:
+            url = self.driver.current_url
+        except Exception:
+            url = ""
+        content_hash = hashlib.sha256(html_content.encode('utf-8', 'ignore')).hexdigest()[:16]
+        return f"{url}:{content_hash}"
+    
+    def _load_cached_login_data(self, cache_key: str) -> Optional[Dict]:
+        """Load a previously detected login form for this page"""
+        if not LOGIN_CACHE_FILE:
+            return None
+        try:
+            with shelve.open(LOGIN_CACHE_FILE) as cache:
+                return cache.get(cache_key)
+        except Exception as e:
+            if DEBUG_MODE:
+                print(f"   • Login cache read failed: {e}")
+            return None
+    
+    def _store_login_data(self, cache_key: str, login_data: Dict) -> None:
+        """Persist a successful login form detection for later runs"""
+        if not LOGIN_CACHE_FILE:
+            return
+        try:
+            with shelve.open(LOGIN_CACHE_FILE) as cache:
+                cache[cache_key] = login_data
+        except Exception as e:
+            if DEBUG_MODE:
+                print(f"   • Login cache write failed: {e}")
+    
     def _ai_login_detection(self, html_content: str) -> Dict:
         """Use AI to detect login form elements"""
         try:
             print("🧠 Using AI for login detection...")
             
-            truncated_html = html_content[:MAX_HTML_LENGTH] if len(html_content) > MAX_HTML_LENGTH else html_content
+            truncated_html = extract_login_relevant_html(html_content, MAX_HTML_LENGTH)
+            if DEBUG_MODE:
+                print(f"   • Sending {len(truncated_html)} of {len(html_content)} characters to AI")
             
-            prompt = PromptLibrary.get_prompt('login_form_detection', html_content=truncated_html)
+            messages = PromptLibrary.get_messages('login_form_detection', html_content=truncated_html)
             
             try:
-                response = ollama.chat(
+                response = llm_client.chat_json(
                     model=OLLAMA_MODEL,
-                    messages=[{"role": "user", "content": prompt}],
-                    options={
-                        "temperature": 0.1,
-                        "num_predict": 500,
-                        "top_p": 0.8
-                    }
+                    messages=messages,
+                    options={**LLM_EXTRACT_OPTIONS, "num_predict": 300}
                 )
 
                 response_content = response["message"]["content"]
@@ -137,7 +273,7 @@ class LoginHandler:
                     ai_result = json.loads(response_content)
                 except json.JSONDecodeError:
                     # If that fails, try to extract JSON block from response
-                    json_match = re.search(r'\{.*\}', response_content, re.DOTALL)
+                    json_match = JSON_OBJECT_RE.search(response_content)
                     if json_match:
                         try:
                             ai_result = json.loads(json_match.group())
@@ -165,51 +301,13 @@ class LoginHandler:
         """Fallback pattern-based login detection"""
         print("🔄 Using fallback login detection...")
         
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Find username field
-        username_field = None
-        username_selectors = [
-            "input[type='email']",
-            "input[type='text'][name*='user']",
-            "input[type='text'][id*='user']",
-            "input[type='text'][placeholder*='user']",
-            "input[type='text'][placeholder*='email']"
-        ]
-        
-        for selector in username_selectors:
-            elements = soup.select(selector)
-            if elements:
-                username_field = selector
-                break
-        
-        if not username_field:
-            # Generic text input
-            text_inputs = soup.select("input[type='text']")
-            if text_inputs:
-                username_field = "input[type='text']"
+        soup = BeautifulSoup(html_content, HTML_PARSER, parse_only=LOGIN_FIELD_STRAINER)
         
-        # Find password field  
-        password_field = None
-        password_inputs = soup.select("input[type='password']")
-        if password_inputs:
-            password_field = "input[type='password']"
-        
-        # Find submit button
-        submit_button = None
-        submit_selectors = [
-            "button[type='submit']",
-            "input[type='submit']", 
-            "button:contains('Login')",
-            "button:contains('Sign In')",
-            "button"
-        ]
-        
-        for selector in submit_selectors:
-            elements = soup.select(selector)
-            if elements:
-                submit_button = selector
-                break
+        # One pass collects every candidate input/button, then each field takes its best selector
+        candidates = FALLBACK_FIELD_UNION.select(soup)
+        username_field = _first_matching_selector(FALLBACK_USERNAME_MATCHERS, candidates)
+        password_field = _first_matching_selector(FALLBACK_PASSWORD_MATCHERS, candidates)
+        submit_button = _first_matching_selector(FALLBACK_SUBMIT_MATCHERS, candidates)
         
         found = bool(username_field and password_field)
         
@@ -251,14 +349,11 @@ class LoginHandler:
     def _perform_login(self, username: str, password: str, login_data: Dict) -> bool:
         """Fill login form and submit"""
         try:
-            # Find username element
-            username_element = self._find_element_universal(login_data.get("username_field"))
+            username_element, password_element, submit_element = self._find_login_elements(login_data)
             if not username_element:
                 print("❌ Could not find username field")
                 return False
             
-            # Find password element
-            password_element = self._find_element_universal(login_data.get("password_field"))
             if not password_element:
                 print("❌ Could not find password field")
                 return False
@@ -283,40 +378,52 @@ class LoginHandler:
                 return False
             
             # Submit form
-            return self._submit_login_form(login_data, password_element)
+            return self._submit_login_form(submit_element, password_element)
             
         except Exception as e:
             print(f"❌ Login error: {e}")
             return False
     
+    def _find_login_elements(self, login_data: Dict) -> tuple:
+        """Look up the username, password and submit elements with a single script call"""
+        selectors = [login_data.get(field) for field in ("username_field", "password_field", "submit_button")]
+        try:
+            elements = self.driver.execute_script(FIND_LOGIN_ELEMENTS_JS, *selectors)
+        except Exception as e:
+            if DEBUG_MODE:
+                print(f"   • Script lookup failed ({e}) - using per-selector lookups")
+            elements = [None, None, None]
+        
+        # Anything the script couldn't resolve falls back to the WebDriver locator strategies
+        return tuple(element or self._find_element_universal(selector)
+                     for element, selector in zip(elements, selectors))
+    
     def _find_element_universal(self, selector: str):
-        """Find element using various selector methods"""
+        """Find element by CSS selector, name or id with one grouped query, preferring visible matches"""
         if not selector:
             return None
-            
+        
+        # AI/cached selectors are sometimes a bare name or id rather than CSS
+        quoted = selector.replace('\\', '\\\\').replace('"', '\\"')
+        attribute_query = f'[name="{quoted}"], [id="{quoted}"]'
         try:
-            if selector.startswith('#'):
-                return self.driver.find_element(By.ID, selector[1:])
-            elif selector.startswith('.'):
-                return self.driver.find_element(By.CLASS_NAME, selector[1:])
-            else:
-                return self.driver.find_element(By.CSS_SELECTOR, selector)
-        except:
+            elements = self.driver.find_elements(By.CSS_SELECTOR, f"{selector}, {attribute_query}")
+        except Exception:
+            # Not valid CSS (e.g. :contains) - the name/id lookups still apply
             try:
-                return self.driver.find_element(By.NAME, selector)
-            except:
-                try:
-                    return self.driver.find_element(By.ID, selector)
-                except:
-                    return None
+                elements = self.driver.find_elements(By.CSS_SELECTOR, attribute_query)
+            except Exception:
+                return None
+        
+        if not elements:
+            return None
+        return next((element for element in elements if element.is_displayed()), elements[0])
     
-    def _submit_login_form(self, login_data: Dict, password_element) -> bool:
+    def _submit_login_form(self, submit_element, password_element) -> bool:
         """Submit the login form using various methods"""
         url_before = self.driver.current_url
         
         # Try submit button first
-        submit_element = self._find_element_universal(login_data.get("submit_button"))
-        
         if submit_element and is_element_visible_and_enabled(submit_element):
             print("🔘 Clicking submit button...")
             try:
@@ -330,9 +437,14 @@ class LoginHandler:
             print("🔘 Pressing Enter on password field...")
             password_element.send_keys(Keys.RETURN)
         
-        # Wait for response
+        # Wait for a redirect or an error message (LOGIN_WAIT_TIME is the upper bound)
         print("⏳ Waiting for login response...")
-        time.sleep(LOGIN_WAIT_TIME)
+        try:
+            WebDriverWait(self.driver, LOGIN_WAIT_TIME).until(
+                lambda d: d.current_url != url_before or _has_login_error(get_relevant_html(d).lower())
+            )
+        except TimeoutException:
+            pass
         
         # Check if login was successful
         return self._verify_login_success(url_before)
@@ -341,19 +453,10 @@ class LoginHandler:
         """Verify if login was successful"""
         try:
             url_after = self.driver.current_url
-            page_source = self.driver.page_source.lower()
+            page_source = get_relevant_html(self.driver).lower()
             
             # Check for error messages
-            error_indicators = [
-                "invalid username or password",
-                "invalid email or password", 
-                "login failed",
-                "authentication failed",
-                "incorrect username",
-                "incorrect password"
-            ]
-            
-            has_error = any(error in page_source for error in error_indicators)
+            has_error = _has_login_error(page_source)
             if has_error:
                 print("❌ Login failed - error message detected")
                 return False
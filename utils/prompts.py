@@ -4,9 +4,18 @@ Prompt Library for AutoBilling
 Centralized collection of AI prompts used throughout the system
 """
 
+import string
+
+_FORMATTER = string.Formatter()
+
 class PromptLibrary:
     """Collection of AI prompts for various AutoBilling tasks"""
     
+    # Pre-split templates: prompt name -> ((literal_text, field_name), ...)
+    _compiled_templates = {}
+    # Static system prefixes: prompt name -> (instructions with fields moved out, field names)
+    _static_prefixes = {}
+    
     # Login Detection Prompts
     LOGIN_FORM_DETECTION = """
     You are a login form detection expert. Analyze this HTML and return ONLY valid JSON.
@@ -41,8 +50,9 @@ class PromptLibrary:
     High Priority (90-100): Transaction history, billing history, payment history
     Medium Priority (70-89): Account info, statements, usage data  
     Low Priority (50-69): General dashboard, overview pages
+    Skip (0-49): Settings, help, non-billing pages
     
-    Return JSON:
+    Return ONLY this JSON:
     {{
         "ranked_links": [
             {{
@@ -349,14 +359,80 @@ If no billing data visible, return: {{"bills": [], "account_info": {{}}}}
 
 RETURN ONLY JSON - NO OTHER TEXT."""
 
+    VISION_SCREENSHOT_EXTRACTION = """
+    Extract billing data from this utility website screenshot.
+    
+    Look for:
+    - Bill amounts and dates in tables
+    - Transaction history 
+    - Payment records
+    - Account information
+    
+    Return JSON:
+    {{
+        "bills": [
+            {{
+                "date": "MM/DD/YYYY", 
+                "amount": 199.00,
+                "description": "Bill description",
+                "type": "bill"
+            }}
+        ],
+        "account_info": {{
+            "account_number": "if visible"
+        }}
+    }}
+    
+    Extract ALL visible billing entries. Be precise with dates and amounts.
+    """
+
+    @classmethod
+    def _compile_template(cls, prompt_name: str) -> tuple:
+        """Split a prompt template into literal/field parts once and cache it"""
+        key = prompt_name.upper()
+        compiled = cls._compiled_templates.get(key)
+        if compiled is None:
+            if not hasattr(cls, key):
+                raise ValueError(f"Prompt '{prompt_name}' not found")
+            
+            prompt_template = getattr(cls, key)
+            compiled = tuple(
+                (literal_text, field_name)
+                for literal_text, field_name, _, _ in _FORMATTER.parse(prompt_template)
+            )
+            cls._compiled_templates[key] = compiled
+        return compiled
+    
     @classmethod
     def get_prompt(cls, prompt_name: str, **kwargs) -> str:
         """Get a formatted prompt by name with variables substituted"""
-        if not hasattr(cls, prompt_name.upper()):
-            raise ValueError(f"Prompt '{prompt_name}' not found")
+        parts = []
+        for literal_text, field_name in cls._compile_template(prompt_name):
+            parts.append(literal_text)
+            if field_name is not None:
+                parts.append(str(kwargs[field_name]))
+        return ''.join(parts)
+    
+    @classmethod
+    def get_messages(cls, prompt_name: str, **kwargs) -> list:
+        """Get a prompt as chat messages: identical instructions first, variable content last"""
+        key = prompt_name.upper()
+        if key not in cls._static_prefixes:
+            parts, fields = [], []
+            for literal_text, field_name in cls._compile_template(prompt_name):
+                parts.append(literal_text)
+                if field_name is not None:
+                    parts.append(f"<{field_name.upper()} - provided in the next message>")
+                    fields.append(field_name)
+            cls._static_prefixes[key] = (''.join(parts), tuple(fields))
         
-        prompt_template = getattr(cls, prompt_name.upper())
-        return prompt_template.format(**kwargs)
+        # The system message never changes between calls, so Ollama can reuse its KV cache
+        instructions, fields = cls._static_prefixes[key]
+        content = '\n\n'.join(f"{field.upper()}:\n{kwargs[field]}" for field in fields)
+        return [
+            {"role": "system", "content": instructions},
+            {"role": "user", "content": content}
+        ]
     
     @classmethod
     def list_prompts(cls) -> list:
@@ -4,25 +4,79 @@ Utility functions for AutoBilling
 Common helpers used across modules
 """
 
+import os
 import time
 import random
 import re
 import json
 from datetime import datetime
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
+from selenium.common.exceptions import TimeoutException
+from bs4 import BeautifulSoup, Comment
 
 from .config import (
     HUMAN_DELAY, TYPING_DELAY, SPA_LOADING_SELECTORS, SPA_CONTENT_SELECTORS,
     DATE_PATTERNS, AMOUNT_PATTERNS, MIN_UTILITY_AMOUNT, MAX_UTILITY_AMOUNT,
-    MAX_YEARS_BACK, MAX_YEARS_FORWARD, SPA_CONTENT_WAIT
+    MAX_YEARS_BACK, MAX_YEARS_FORWARD, SPA_CONTENT_WAIT, MAX_HTML_LENGTH,
+    MAX_HTML_TOKENS, TOKENIZER_NAME
 )
 
+# lxml parses in C and is several times faster on large utility pages (optional)
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Token-aware truncation (optional) - prompt cost depends on tokens, not characters
+try:
+    from tokenizers import Tokenizer
+    TOKENIZERS_AVAILABLE = True
+except ImportError:
+    TOKENIZERS_AVAILABLE = False
+
+# Tags that never carry billing/login content but can fill most of a truncated prompt
+NON_CONTENT_TAGS = ('script', 'style', 'noscript', 'svg')
+WHITESPACE_RE = re.compile(r'\s+')
+
+# Elements likely to hold bill history when a page is too large to send to the AI whole
+BILLING_CONTAINER_SELECTOR = ', '.join([
+    'table', '[class*="bill" i]', '[id*="bill" i]', '[class*="payment" i]', '[id*="payment" i]',
+    '[class*="transaction" i]', '[class*="statement" i]', '[class*="invoice" i]'
+])
+
+# Compiled once instead of on every row/call
+# One alternation per kind so each text is scanned once; every pattern has a single group, read via lastindex
+DATE_RE = re.compile('|'.join(f'(?:{pattern})' for pattern in DATE_PATTERNS), re.IGNORECASE)
+AMOUNT_RE = re.compile('|'.join(f'(?:{pattern})' for pattern in AMOUNT_PATTERNS), re.IGNORECASE)
+ACCOUNT_URL_RES = [
+    re.compile(r'/(\d{2,}-\d{4,}-\d{2,})'),  # XX-XXXX-XX format
+    re.compile(r'/(\d{8,})'),  # 8+ digit account numbers
+]
+NON_AMOUNT_CHARS_RE = re.compile(r'[^\d.]')
+JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)  # Outermost {...} in a chatty AI response
+
+# Date shapes accepted by parse_date_flexible: the matching shape says which group is year/month/day, so a
+# date is built directly instead of trying strptime formats until one stops raising
+MONTH_ABBREVIATIONS = {name: number for number, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], start=1)}
+DATE_SHAPES = [
+    (re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})'), 'mdy'),  # MM/DD/YYYY
+    (re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})'), 'ymd'),  # YYYY-MM-DD
+    (re.compile(r'(\d{1,2})-(\d{1,2})-(\d{4})'), 'mdy'),  # MM-DD-YYYY
+    (re.compile(r'([A-Za-z]{3})\s+(\d{1,2}),\s+(\d{4})'), 'mdy'),  # Jan 15, 2024
+    (re.compile(r'(\d{1,2})\s+([A-Za-z]{3})\s+(\d{4})'), 'dmy'),  # 15 Jan 2024
+    (re.compile(r'([A-Za-z]{3})-(\d{1,2})-(\d{4})'), 'mdy'),  # Jan-15-2024
+    (re.compile(r'(\d{1,2})/(\d{1,2})/(\d{2})'), 'mdy'),  # MM/DD/YY (assume 2000s)
+]
+
 @dataclass
 class BillInfo:
     """Data class to store billing information"""
@@ -52,6 +106,26 @@ def human_like_typing(element, text: str, delay_range: tuple = None):
         element.send_keys(char)
         time.sleep(random.uniform(*delay_range))
 
+# Runtime.evaluate expressions for reading only part of the DOM (page_source serializes <head> scripts too)
+BODY_HTML_JS = "document.body.outerHTML"
+MAIN_CONTENT_HTML_JS = "(document.querySelector('main') || document.querySelector('#content') || document.body).outerHTML"
+
+def get_relevant_html(driver, expression: str = BODY_HTML_JS) -> str:
+    """Read a DOM subtree's HTML through CDP, falling back to the full page_source"""
+    try:
+        result = driver.execute_cdp_cmd("Runtime.evaluate", {"expression": expression, "returnByValue": True})
+        html_content = result["result"].get("value")
+        if html_content:
+            return html_content
+    except Exception:
+        pass
+    return driver.page_source
+
+def _spa_content_rendered(driver):
+    """WebDriverWait condition: the SPA content elements once more than two have rendered"""
+    content_elements = driver.find_elements(By.CSS_SELECTOR, SPA_CONTENT_SELECTORS)
+    return content_elements if len(content_elements) > 2 else False
+
 def wait_for_spa_content(driver, max_wait: int = SPA_CONTENT_WAIT):
     """Wait for SPA/Angular content to load"""
     try:
@@ -65,18 +139,14 @@ def wait_for_spa_content(driver, max_wait: int = SPA_CONTENT_WAIT):
         except:
             pass
         
-        # Wait for content to render
-        for i in range(max_wait):
-            time.sleep(1.5)
-            try:
-                content_elements = driver.find_elements(By.CSS_SELECTOR, SPA_CONTENT_SELECTORS)
-                if len(content_elements) > 2:
-                    print(f"✅ SPA content loaded ({len(content_elements)} elements)")
-                    return
-            except:
-                pass
-            if i < max_wait - 1:
-                print(f"⏳ Waiting for content... (attempt {i+1}/{max_wait})")
+        # Wait for content to render (returns as soon as enough content elements exist)
+        try:
+            content_elements = WebDriverWait(driver, max_wait * 1.5, poll_frequency=0.25).until(
+                _spa_content_rendered
+            )
+            print(f"✅ SPA content loaded ({len(content_elements)} elements)")
+        except TimeoutException:
+            print(f"⏳ SPA content still sparse after {max_wait * 1.5:.1f}s, continuing...")
                 
     except Exception as e:
         print(f"⚠️ SPA content wait error: {e}")
@@ -121,22 +191,18 @@ def extract_dates_and_amounts(text: str) -> List[Dict]:
     amounts_found = []
     
     # Find dates
-    for date_pattern in DATE_PATTERNS:
-        matches = re.finditer(date_pattern, text, re.IGNORECASE)
-        for match in matches:
-            dates_found.append(match.group(1))
+    for match in DATE_RE.finditer(text):
+        dates_found.append(match.group(match.lastindex))
     
     # Find amounts
-    for amount_pattern in AMOUNT_PATTERNS:
-        matches = re.finditer(amount_pattern, text, re.IGNORECASE)
-        for match in matches:
-            try:
-                amount_str = match.group(1).replace(',', '')
-                amount = float(amount_str)
-                if MIN_UTILITY_AMOUNT <= amount <= MAX_UTILITY_AMOUNT:
-                    amounts_found.append(amount)
-            except:
-                continue
+    for match in AMOUNT_RE.finditer(text):
+        try:
+            amount_str = match.group(match.lastindex).replace(',', '')
+            amount = float(amount_str)
+            if MIN_UTILITY_AMOUNT <= amount <= MAX_UTILITY_AMOUNT:
+                amounts_found.append(amount)
+        except:
+            continue
     
     # Combine dates and amounts
     transactions = []
@@ -154,27 +220,19 @@ def extract_dates_and_amounts(text: str) -> List[Dict]:
 
 def parse_date_flexible(date_str: str) -> Optional[datetime]:
     """Parse date with multiple format attempts"""
-    date_formats = [
-        '%m/%d/%Y', '%Y-%m-%d', '%m-%d-%Y',
-        '%b %d, %Y', '%d %b %Y', '%b-%d-%Y'
-    ]
-    
-    for date_format in date_formats:
-        try:
-            return datetime.strptime(date_str, date_format)
-        except:
+    for shape_re, order in DATE_SHAPES:
+        match = shape_re.fullmatch(date_str)
+        if not match:
             continue
-    
-    # Handle 2-digit years specially (assume 2020s)
-    if '/' in date_str:
+        parts = dict(zip(order, match.groups()))
+        month = int(parts['m']) if parts['m'].isdigit() else MONTH_ABBREVIATIONS.get(parts['m'].lower())
+        year = int(parts['y'])
+        if year < 100:  # 2-digit years are 2020s bills, not 1920s
+            year += 2000
         try:
-            temp_date = datetime.strptime(date_str, '%m/%d/%y')
-            if temp_date.year < 2000:  # Convert 1900s to 2000s
-                corrected_year = temp_date.year + 100
-                return temp_date.replace(year=corrected_year)
-            return temp_date
-        except:
-            pass
+            return datetime(year, month, int(parts['d']))
+        except (TypeError, ValueError):  # Unknown month name or impossible day
+            return None
     
     return None
 
@@ -185,18 +243,26 @@ def is_valid_utility_date(date: datetime) -> bool:
 
 def extract_account_number_from_url(url: str) -> Optional[str]:
     """Extract account number from URL using common patterns"""
-    account_patterns = [
-        r'/(\d{2,}-\d{4,}-\d{2,})',  # XX-XXXX-XX format
-        r'/(\d{8,})',  # 8+ digit account numbers
-    ]
-    
-    for pattern in account_patterns:
-        match = re.search(pattern, url, re.IGNORECASE)
+    for account_re in ACCOUNT_URL_RES:
+        match = account_re.search(url)
         if match:
             return match.group(1)
     
     return None
 
+def get_base_url(url: str) -> str:
+    """Return scheme://host[:port] for a URL"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+@lru_cache(maxsize=1024)
+def canonical_url(url: str) -> str:
+    """Normalize a URL for visited checks: lowercase scheme/host, no trailing slash, no in-page #anchor"""
+    parts = urlsplit(url)
+    # Hash-routed SPAs (#/billing, #!/billing) use the fragment as the page path, so keep those
+    fragment = parts.fragment if parts.fragment.startswith(('/', '!/')) else ''
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), parts.query, fragment))
+
 def find_elements_by_multiple_selectors(driver, selectors: List[str]):
     """Find elements using multiple CSS selectors"""
     elements = []
@@ -229,7 +295,7 @@ def clean_amount_string(amount_str: str) -> float:
     """Clean and convert amount string to float"""
     try:
         # Remove currency symbols and commas
-        cleaned = re.sub(r'[^\d.]', '', amount_str)
+        cleaned = NON_AMOUNT_CHARS_RE.sub('', amount_str)
         return float(cleaned) if cleaned else 0.0
     except:
         return 0.0
@@ -287,6 +353,97 @@ def deduplicate_transactions(transactions: List[Dict]) -> List[Dict]:
     
     return list(unique_data.values())
 
-def truncate_html_content(html_content: str, max_length: int = 15000) -> str:
-    """Truncate HTML content for AI processing"""
-    return html_content[:max_length] if len(html_content) > max_length else html_content 
\ No newline at end of file
+@lru_cache(maxsize=8)
+def parse_html(html_content: str) -> BeautifulSoup:
+    """Parse a page once and share the tree - read-only, callers that decompose tags must parse their own copy"""
+    return BeautifulSoup(html_content, HTML_PARSER)
+
+@lru_cache(maxsize=8)
+def get_page_text(html_content: str) -> str:
+    """Full text of a page, extracted once from the shared parse_html tree"""
+    return parse_html(html_content).get_text()
+
+@lru_cache(maxsize=8)
+def preclean_html(html_content: str, extra_tags: tuple = ()) -> str:
+    """Strip scripts, styles, SVG and comments and collapse whitespace so truncation keeps page content"""
+    soup = BeautifulSoup(html_content, HTML_PARSER)
+    for element in soup(list(NON_CONTENT_TAGS + extra_tags)):
+        element.decompose()
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+    return WHITESPACE_RE.sub(' ', str(soup))
+
+@lru_cache(maxsize=1)
+def _get_tokenizer():
+    """Load the model tokenizer once from a local file or the local Hugging Face cache, or None"""
+    if not TOKENIZERS_AVAILABLE:
+        return None
+    try:
+        if os.path.isfile(TOKENIZER_NAME):
+            return Tokenizer.from_file(TOKENIZER_NAME)
+        # Never download in the middle of a scrape - only use a tokenizer that is already cached
+        from huggingface_hub import hf_hub_download
+        return Tokenizer.from_file(hf_hub_download(TOKENIZER_NAME, "tokenizer.json", local_files_only=True))
+    except Exception:
+        return None
+
+def truncate_html_content(html_content: str, max_length: int = 15000, max_tokens: int = MAX_HTML_TOKENS) -> str:
+    """Truncate HTML content for AI processing to max_length characters (and to a token budget when a tokenizer is available)"""
+    html_content = html_content[:max_length]
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return html_content
+    
+    # Cut at the last token boundary that fits the budget
+    encoding = tokenizer.encode(html_content)
+    if len(encoding.ids) <= max_tokens:
+        return html_content
+    return html_content[:encoding.offsets[max_tokens][0]]
+
+def extract_login_relevant_html(html_content: str, max_length: int = MAX_HTML_LENGTH) -> str:
+    """Serialize only login-relevant tags so the AI prompt isn't filled with script blobs"""
+    try:
+        soup = BeautifulSoup(html_content, HTML_PARSER)
+        
+        # Drop non-content elements before collecting tags
+        for element in soup(list(NON_CONTENT_TAGS)):
+            element.decompose()
+        
+        # Forms carry their own inputs/buttons; only collect loose fields outside of forms
+        forms = soup.find_all('form')
+        loose_fields = [tag for tag in soup.find_all(['input', 'button', 'label'])
+                        if tag.find_parent('form') is None]
+        links = soup.find_all('a', href=True)[:50]
+        
+        parts = [WHITESPACE_RE.sub(' ', str(tag)) for tag in forms + loose_fields + links]
+        relevant_html = '\n'.join(parts)
+        
+        # Nothing recognisable (e.g. JS-rendered shell) - fall back to the cleaned page
+        if not relevant_html:
+            return truncate_html_content(preclean_html(html_content), max_length)
+        
+        return truncate_html_content(relevant_html, max_length)
+    except Exception:
+        return truncate_html_content(html_content, max_length)
+
+def extract_billing_relevant_html(html_content: str, max_length: int = MAX_HTML_LENGTH) -> str:
+    """Serialize only billing tables/containers when the cleaned page won't fit the AI prompt"""
+    cleaned_html = preclean_html(html_content, ('nav', 'header', 'footer'))
+    if len(cleaned_html) <= max_length:
+        return cleaned_html
+    try:
+        soup = BeautifulSoup(cleaned_html, HTML_PARSER)
+        
+        # Outermost matches only - a bill table inside a billing panel is serialized once
+        kept = set()
+        parts = []
+        for tag in soup.select(BILLING_CONTAINER_SELECTOR):
+            if any(id(parent) in kept for parent in tag.parents):
+                continue
+            kept.add(id(tag))
+            parts.append(str(tag))
+        
+        # Nothing recognisable - fall back to the start of the cleaned page
+        return truncate_html_content('\n'.join(parts) or cleaned_html, max_length)
+    except Exception:
+        return truncate_html_content(cleaned_html, max_length)